@@ -0,0 +1,101 @@
+import math
+import random
+
+import pytest
+from yinsh.alphabeta import WIN_SCORE, AlphaBeta, _from_table, _to_table, material
+from yinsh.game import GameState
+from yinsh.types import Hex, Marker, Player, Ring
+
+from tests.test_game import setup_game, snapshot
+
+
+def row_threat_game():
+    """Blitz game where any move of white's ring at (-3, 4) completes a row and wins"""
+    game = GameState.new_game("blitz")
+    for hex in [Hex(-3, 4), Hex(4, -4), Hex(4, -3), Hex(3, -4), Hex(2, -4)]:
+        game.board._grid[hex] = Ring.WHITE
+    for hex in [Hex(0, 0), Hex(1, 0), Hex(2, 0), Hex(1, 1), Hex(0, 2)]:
+        game.board._grid[hex] = Ring.BLACK
+    for r in range(4):
+        game.board._grid[Hex(-3, r)] = Marker.WHITE
+    game.requires_setup = False
+    return game
+
+
+class TestAlphaBeta:
+    def test_material(self):
+        game = row_threat_game()
+        assert material(game, Player.WHITE) == 4
+        assert material(game, Player.BLACK) == -4
+        game.players.black.rings = 1
+        assert material(game, Player.WHITE) == -996
+
+    def test_finds_win(self):
+        game = row_threat_game()
+        before = snapshot(game)
+        result = AlphaBeta().search(game, depth=1)
+        assert snapshot(game) == before
+        assert result.move.src_hex == Hex(-3, 4)
+        assert result.score == WIN_SCORE - 2  # The row's removal is the second ply
+        assert result.pv[0] == result.move
+
+    def test_win_score_by_ply(self):
+        # The same won position reached first after 3 plies, then by a shorter route after 1
+        game = row_threat_game()
+        engine = AlphaBeta()
+        assert engine._negamax(game, 1, -math.inf, math.inf, 3) == WIN_SCORE - 5
+        assert engine.table.probe(game.hash) is not None
+        assert engine._negamax(game, 1, -math.inf, math.inf, 1) == WIN_SCORE - 3
+
+        # Losses are stored the same way
+        assert _from_table(_to_table(-WIN_SCORE + 5, 3), 1) == -WIN_SCORE + 3
+        assert _from_table(_to_table(12.5, 3), 1) == 12.5
+
+    def test_depth(self):
+        game = setup_game()
+        result = AlphaBeta().search(game, depth=2)
+        assert result.depth == 2
+        assert result.nodes > 0
+        assert result.move in set(game.legal_moves)
+        assert len(result.pv) == 2
+
+    def test_budgets(self):
+        game = setup_game()
+        result = AlphaBeta().search(game, max_nodes=200)
+        assert result.nodes == 200
+        assert result.move in set(game.legal_moves)
+
+        result = AlphaBeta().search(game, time_limit=0.2)
+        assert result.elapsed < 1
+        assert result.move in set(game.legal_moves)
+
+        with pytest.raises(ValueError):
+            AlphaBeta().search(game)
+
+    def test_game_over(self):
+        game = setup_game()
+        game.players.black.rings = 3
+        with pytest.raises(ValueError):
+            AlphaBeta().search(game, depth=1)
+
+    def test_midgames(self):
+        # Removal nodes share plies with ring move nodes, so their killers must not mix
+        games = [
+            GameState.from_bytes(
+                bytes.fromhex("1cc16de3b68124b77183189020c92d03c65104306c18406023300204392de1300021")
+            )
+        ]
+        rng = random.Random(0)
+        while len(games) < 8:
+            game = setup_game()
+            for _ in range(rng.randrange(30, 90)):
+                moves = list(game.legal_moves)
+                if not moves:
+                    break
+                game.make_move(rng.choice(moves))
+            if not game.is_over():
+                games.append(game)
+
+        for game in games:
+            result = AlphaBeta().search(game, depth=3, max_nodes=5000)
+            assert result.move in set(game.legal_moves)
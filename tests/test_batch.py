@@ -0,0 +1,82 @@
+import random
+
+import pytest
+from yinsh.helpers import inv_coordinate_index, num_cells
+
+from tests.test_game import setup_game
+
+np = pytest.importorskip("numpy")
+from yinsh.batch import _RAYS, WALL, encode, legal_slides, simulate  # noqa: E402
+
+
+def random_positions(count: int, seed: int = 0):
+    """Positions from random games that have finished setup and have no pending removals"""
+    rng = random.Random(seed)
+    positions = []
+    while len(positions) < count:
+        game = setup_game()
+        for _ in range(rng.randrange(1, 40)):
+            moves = list(game.legal_moves)
+            if not moves or game.is_over():
+                break
+            game.make_move(rng.choice(moves))
+        moves = list(game.legal_moves)
+        if moves and moves[0].is_play:
+            positions.append(game)
+    return positions
+
+
+class TestBatch:
+    def test_encode(self):
+        game = setup_game()
+        cells = encode(game)
+        assert cells.shape == (num_cells,)
+        assert (cells == 1).sum() == 5
+        assert (cells == 2).sum() == 5
+        assert not cells[(cells != 1) & (cells != 2)].any()
+
+    def test_legal_slides(self):
+        games = random_positions(20)
+        cells = np.full((len(games), num_cells + 1), WALL, dtype=np.int8)
+        for i, game in enumerate(games):
+            cells[i, :num_cells] = encode(game)
+        white = np.array([game.next_player.value for game in games])
+        sources, legal = legal_slides(cells, white)
+
+        for i, game in enumerate(games):
+            expected = {(move.src_hex, move.dst_hex) for move in game.legal_moves}
+            found = set()
+            for slot, direction, step in zip(*np.nonzero(legal[i])):
+                src = int(sources[i, slot])
+                dst = int(_RAYS[src, direction, step])
+                found.add((inv_coordinate_index[src], inv_coordinate_index[dst]))
+            assert found == expected
+
+    def test_simulate(self):
+        result = simulate(games=200, seed=0)
+        assert result.finished.all()
+        assert set(np.unique(result.outcomes)) <= {-1, 0, 1}
+        assert (result.lengths > 10).all()
+        assert (result.outcomes != 0).any()
+
+        again = simulate(games=200, seed=0)
+        assert (again.outcomes == result.outcomes).all()
+        assert (again.lengths == result.lengths).all()
+
+    def test_simulate_from_game(self):
+        game = setup_game()
+        result = simulate(game, games=50, seed=1)
+        assert result.finished.all()
+        assert (result.lengths >= 1).all()
+
+        limited = simulate(game, games=50, max_moves=2, seed=1)
+        assert not limited.finished.any()
+        assert (limited.outcomes == 0).all()
+
+    def test_finished_game(self):
+        game = setup_game()
+        game.players.white.rings = 3
+        result = simulate(game, games=5)
+        assert result.finished.all()
+        assert (result.outcomes == 1).all()
+        assert (result.lengths == 0).all()
@@ -1,5 +1,6 @@
 import pytest
 from yinsh.board import Board
+from yinsh.helpers import coordinate_index
 from yinsh.types import Hex, IllegalMoveError, Marker, Player, Ring
 
 
@@ -187,3 +188,121 @@ class TestBoard:
         assert set(board.markers.items()) == set(
             [(Hex(0, 0), Marker.BLACK), (Hex(1, 0), Marker.BLACK)]
         )
+
+    def test_masks(self):
+        board = Board.empty()
+        assert board.occupied == 0
+
+        board.place_ring(Player.WHITE, Hex(0, 0))
+        board.place_ring(Player.BLACK, Hex(0, 1))
+        assert board._ring_masks[Player.WHITE.value] == 1 << coordinate_index[Hex(0, 0)]
+        assert board._ring_masks[Player.BLACK.value] == 1 << coordinate_index[Hex(0, 1)]
+
+        board.move_ring(Player.WHITE, Hex(0, 0), Hex(0, -2))
+        assert board._marker_masks[Player.WHITE.value] == 1 << coordinate_index[Hex(0, 0)]
+        assert board.occupied == sum(
+            1 << coordinate_index[hex] for hex in [Hex(0, 0), Hex(0, 1), Hex(0, -2)]
+        )
+
+    def test_views(self):
+        board = Board.empty()
+
+        # Writes through a view are visible in the masks and in the other views
+        board._grid[Hex(0, 0)] = Marker.BLACK
+        board.rings[Hex(1, 0)] = Ring.WHITE
+        assert board._marker_masks[Player.BLACK.value] == 1 << coordinate_index[Hex(0, 0)]
+        assert board.markers == {Hex(0, 0): Marker.BLACK}
+        assert board.rings == {Hex(1, 0): Ring.WHITE}
+        assert len(board._grid) == 2
+
+        with pytest.raises(TypeError):
+            board.rings[Hex(2, 0)] = Marker.WHITE
+
+        with pytest.raises(KeyError):
+            del board.rings[Hex(0, 0)]
+
+        del board._grid[Hex(0, 0)]
+        assert board.markers == {}
+        assert board.occupied == 1 << coordinate_index[Hex(1, 0)]
+
+    def test_hash(self):
+        board = Board.empty()
+        assert board.hash == 0
+
+        board.place_ring(Player.WHITE, Hex(0, 0))
+        board.place_ring(Player.BLACK, Hex(1, 0))
+        board.move_ring(Player.WHITE, Hex(0, 0), Hex(0, -1))
+        board.move_ring(Player.BLACK, Hex(1, 0), Hex(-1, 0))
+        board.move_ring(Player.WHITE, Hex(0, -1), Hex(0, 1))
+
+        # The incremental key matches a board built directly with the same contents
+        rebuilt = Board.empty()
+        rebuilt._grid = dict(board._grid)
+        assert board.hash == rebuilt.hash != 0
+
+        board._complete_row([Hex(0, 0)])
+        board._remove_ring(Hex(0, 1))
+        del rebuilt._grid[Hex(0, 0)]
+        del rebuilt.rings[Hex(0, 1)]
+        assert board.hash == rebuilt.hash
+
+    def test_rows_incremental(self):
+        board = Board.empty()
+        for r in range(4):
+            board.markers[Hex(0, r)] = Marker.BLACK
+        board.markers[Hex(0, 4)] = Marker.WHITE
+        board.place_ring(Player.BLACK, Hex(1, 3))
+        assert board.get_rows(Player.BLACK) == []
+
+        # Flipping a marker completes a row, and flipping it back breaks the row again
+        board.move_ring(Player.BLACK, Hex(1, 3), Hex(-1, 5))
+        assert board.get_rows(Player.BLACK) == [[Hex(0, r) for r in range(4, -1, -1)]]
+        assert board.get_rows(Player.WHITE) == []
+
+        board.move_ring(Player.BLACK, Hex(-1, 5), Hex(2, 2))
+        assert board.get_rows(Player.BLACK) == []
+
+        # Removing a row clears it
+        board.markers[Hex(0, 4)] = Marker.BLACK
+        row = board.get_rows(Player.BLACK)[0]
+        board._complete_row(row)
+        assert board.get_rows(Player.BLACK) == []
+
+    def test_partial_lines(self):
+        board = Board.empty()
+        board.markers[Hex(0, 0)] = Marker.WHITE
+        board.markers[Hex(0, 1)] = Marker.WHITE
+        # The column q = 0 has 9 cells, and 4 of its windows hold both markers
+        assert board.partial_lines(Player.WHITE)[2] == 4
+        assert board.partial_lines(Player.BLACK) == [0] * 6
+
+        # A black marker blocks the windows it shares with them
+        copy = board.copy()
+        board.markers[Hex(0, 2)] = Marker.BLACK
+        assert board.partial_lines(Player.WHITE)[2] == 1
+        assert copy.partial_lines(Player.WHITE)[2] == 4
+        del board.markers[Hex(0, 2)]
+        assert board.partial_lines(Player.WHITE) == copy.partial_lines(Player.WHITE)
+
+    def test_mobility(self):
+        board = Board.empty()
+        board.place_ring(Player.WHITE, Hex(0, 0))
+        # The lone ring reaches every cell on its six rays of four
+        assert board.mobility(Player.WHITE) == 24
+        assert board.mobility(Player.BLACK) == 0
+
+        # A ring blocks the ray beyond it, and a marker stops the ring just past it
+        board.place_ring(Player.BLACK, Hex(0, 2))
+        board.markers[Hex(1, 0)] = Marker.BLACK
+        assert board.mobility(Player.WHITE) == 24 - 3 - 3
+        assert board.mobility(Player.BLACK) == 19
+
+        # Copies keep their own counts, and undoing a move restores them
+        copy = board.copy()
+        flipped = board._flipped_by(Hex(0, 0), Hex(2, 0))
+        board.move_ring(Player.WHITE, Hex(0, 0), Hex(2, 0))
+        assert board.mobility(Player.WHITE) != 18
+        assert copy.mobility(Player.WHITE) == 18
+        board._unmove_ring(Player.WHITE, Hex(0, 0), Hex(2, 0), flipped)
+        assert board.mobility(Player.WHITE) == 18
+        assert board.transform(1).mobility(Player.BLACK) == 19
@@ -0,0 +1,65 @@
+import pytest
+from yinsh.game import GameState, Move
+from yinsh.helpers import distance
+from yinsh.types import Hex
+
+np = pytest.importorskip("numpy")
+from yinsh.book import (  # noqa: E402
+    OpeningBook,
+    _key,
+    build_book,
+    setup_positions,
+)
+
+
+def first_move(game: GameState):
+    """Places on the first empty cell, scored by the number of rings on the board"""
+    return next(iter(game.legal_moves)), sum(game.board._get_ring_count()) / 10
+
+
+def test_setup_positions():
+    assert [len(setup_positions(plies)) for plies in (1, 2, 3)] == [1, 12, 630]
+
+
+@pytest.fixture(scope="module")
+def book(tmp_path_factory):
+    path = tmp_path_factory.mktemp("book") / "book.ybk"
+    assert build_book(path, plies=3, evaluate=first_move, workers=2) == 630
+    return OpeningBook(path)
+
+
+def test_lookup(book):
+    assert len(book) == 630
+    assert book.slots & (book.slots - 1) == 0 and book.slots >= 2 * len(book)
+
+    game = GameState.new_game()
+    entry = book.lookup(game)
+    assert entry.score == 0
+    assert entry.move in set(game.legal_moves)
+
+    # Every first placement is covered, and symmetric positions get symmetric replies
+    replies = {}
+    for move in list(game.legal_moves):
+        game.make_move(move)
+        entry = book.lookup(game)
+        assert entry.score == pytest.approx(0.1)
+        assert entry.move in set(game.legal_moves)
+        reply = distance(move.src_hex, entry.move.src_hex)
+        assert replies.setdefault(_key(game)[0], reply) == reply
+        game = GameState.new_game()
+    assert len(replies) == 11
+
+
+def test_lookup_misses(book):
+    game = GameState.new_game()
+    for hex in (Hex(0, 0), Hex(1, 0), Hex(2, 0)):
+        game.make_move(Move.place(hex))
+    assert book.lookup(game) is None
+    assert book.lookup(GameState.new_game("blitz")) is None
+
+
+def test_not_a_book(tmp_path):
+    path = tmp_path / "book.ybk"
+    path.write_bytes(bytes(64))
+    with pytest.raises(ValueError):
+        OpeningBook(path)
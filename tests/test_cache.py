@@ -0,0 +1,84 @@
+import pytest
+from yinsh.game import GameState, Move
+from yinsh.types import Hex
+
+from web.cache import CachedPosition, ResponseCache
+
+
+def position(name: str):
+    return CachedPosition(name, {"w": [], "b": []}, None)
+
+
+def test_hits_and_misses():
+    cache = ResponseCache()
+    assert cache.get(1) is None
+    cache.put(1, position("a"))
+    assert cache.get(1) == position("a")
+    assert cache.get(2) is None
+    assert (cache.hits, cache.misses) == (1, 2)
+
+
+def test_lru_eviction():
+    cache = ResponseCache(max_entries=2)
+    cache.put(1, position("a"))
+    cache.put(2, position("b"))
+    # Reading the first entry makes the second the least recently used
+    cache.get(1)
+    cache.put(3, position("c"))
+    assert cache.get(2) is None
+    assert cache.get(1) == position("a")
+    assert cache.get(3) == position("c")
+    assert len(cache) == 2
+    assert cache.evictions == 1
+
+    # Storing a key again replaces its entry without evicting another
+    cache.put(3, position("d"))
+    assert cache.get(3) == position("d")
+    assert cache.evictions == 1
+
+
+def test_stats():
+    cache = ResponseCache(max_entries=1)
+    assert cache.stats == {"entries": 0, "hits": 0, "misses": 0, "hit_rate": 0.0, "evictions": 0}
+    cache.put(1, position("a"))
+    cache.put(2, position("b"))
+    cache.get(1)
+    cache.get(2)
+    cache.get(2)
+    cache.get(2)
+    assert cache.stats == {
+        "entries": 1,
+        "hits": 3,
+        "misses": 1,
+        "hit_rate": 0.75,
+        "evictions": 1,
+    }
+    cache.clear()
+    assert cache.stats["entries"] == cache.stats["hits"] == cache.stats["evictions"] == 0
+
+
+def test_get_position(monkeypatch):
+    pytest.importorskip("fastapi")
+    from web import helpers
+
+    cache = ResponseCache()
+    monkeypatch.setattr(helpers, "cache", cache)
+    game = GameState.new_game()
+    first = helpers.get_position(game)
+    assert helpers.get_position(game) is first
+    assert set(cache._entries) == {(game.hash, "standard")}
+
+    # A changed position is looked up under its new hash, and undoing the move finds the first
+    game.push(Move.place(Hex(0, 0)))
+    second = helpers.get_position(game)
+    assert second.state != first.state
+    assert (game.hash, "standard") in cache._entries
+    game.pop()
+    assert helpers.get_position(game) is first
+
+    # The same board in another variant is kept apart
+    blitz = GameState.new_game("blitz")
+    assert blitz.hash == game.hash
+    helpers.get_position(blitz)
+    assert len(cache) == 3
+    assert (cache.hits, cache.misses) == (2, 3)
@@ -0,0 +1,62 @@
+import json
+import random
+
+import pytest
+from yinsh.game import GameState
+from yinsh.helpers import coordinate_index, inv_coordinate_index, num_cells
+
+from web.codec import DecodeError, content_index, decode_cell, decode_row, encode_state
+
+
+def test_decode_cell():
+    assert decode_cell(0) == inv_coordinate_index[0]
+    assert decode_cell(num_cells - 1) == inv_coordinate_index[num_cells - 1]
+    # Cells are interned, so decoding the same index twice gives the same object
+    assert decode_cell(7) is decode_cell(7)
+
+    for value in (True, False, -1, num_cells, 1.0, "3", None, [1], {"q": 0, "r": 0}):
+        with pytest.raises(DecodeError):
+            decode_cell(value)
+
+
+def test_decode_row():
+    assert decode_row([0, 1, 2, 3, 4]) == [inv_coordinate_index[i] for i in range(5)]
+    for value in ([0, 1, 2, 3], [0, 1, 2, 3, 4, 5], (0, 1, 2, 3, 4), "01234", None):
+        with pytest.raises(DecodeError):
+            decode_row(value)
+    with pytest.raises(DecodeError):
+        decode_row([0, 1, 2, 3, num_cells])
+
+
+def test_encode_state():
+    rng = random.Random(0)
+    game = GameState.new_game()
+    while not game.is_over():
+        text, rows = encode_state(game)
+        state = json.loads(text)
+        assert state["grid"] == {
+            str(coordinate_index[hex]): content_index[content]
+            for hex, content in game.board._grid.items()
+        }
+        assert state["rings"] == {
+            "white": game.players.white.rings,
+            "black": game.players.black.rings,
+        }
+        assert state["requiresSetup"] == game.requires_setup
+        assert state["rows"] == rows
+        assert state["over"] is False
+
+        expected = {}
+        if not game.requires_setup:
+            for move in game.legal_moves:
+                if move.is_play:
+                    key = str(coordinate_index[move.src_hex])
+                    expected.setdefault(key, []).append(coordinate_index[move.dst_hex])
+        assert {src: sorted(dsts) for src, dsts in state["dsts"].items()} == {
+            src: sorted(dsts) for src, dsts in expected.items()
+        }
+        game.push(rng.choice(list(game.legal_moves)))
+
+    state = json.loads(encode_state(game)[0])
+    assert state["over"] is True
+    assert state["dsts"] == {}
@@ -0,0 +1,89 @@
+import random
+
+from yinsh.alphabeta import AlphaBeta
+from yinsh.evaluation import FEATURES, Evaluator, Weights, features, mobility
+from yinsh.game import GameState
+from yinsh.helpers import iter_bits, ring_destinations, window_masks
+from yinsh.types import Player
+
+from tests.test_game import setup_game
+
+
+def count_lines(game: GameState, player: Player):
+    own = game.board._marker_masks[player.value]
+    other = game.board._marker_masks[player.other.value]
+    counts = [0] * 6
+    for mask in window_masks:
+        if own & mask and not other & mask:
+            counts[bin(own & mask).count("1")] += 1
+    return counts
+
+
+def count_destinations(game: GameState, player: Player):
+    board = game.board
+    rings = board._ring_masks[0] | board._ring_masks[1]
+    markers = board._marker_masks[0] | board._marker_masks[1]
+    return sum(
+        len(list(ring_destinations(index, rings, markers)))
+        for index in iter_bits(board._ring_masks[player.value])
+    )
+
+
+def test_incremental_features():
+    rng = random.Random(0)
+    for _ in range(3):
+        game = GameState.new_game()
+        while not game.is_over():
+            for player in Player:
+                assert game.board.partial_lines(player) == count_lines(game, player)
+                assert game.board.mobility(player) == count_destinations(game, player)
+            if not game.requires_setup and not any(game.board._rows):
+                assert mobility(game.board, game.next_player) == game.legal_moves.count()
+            game.push(rng.choice(list(game.legal_moves)))
+
+        # Undoing moves restores the counts as well
+        while game._history:
+            game.pop()
+            for player in Player:
+                assert game.board.partial_lines(player) == count_lines(game, player)
+                assert game.board.mobility(player) == count_destinations(game, player)
+
+
+def test_features():
+    game = setup_game()
+    values = dict(zip(FEATURES, features(game, Player.WHITE)))
+    assert values["rings"] == values["markers"] == values["twos"] == 0
+    assert values["mobility"] == mobility(game.board, Player.WHITE) - mobility(
+        game.board, Player.BLACK
+    )
+    game.players.white.rings = 1
+    values = dict(zip(FEATURES, features(game, Player.WHITE)))
+    assert values["rings"] == 1
+    assert features(game, Player.BLACK) == tuple(-value for value in values.values())
+
+
+def test_evaluator():
+    rng = random.Random(1)
+    game = setup_game()
+    games = []
+    for _ in range(20):
+        game.make_move(rng.choice(list(game.legal_moves)))
+        games.append(game.copy())
+
+    evaluate = Evaluator()
+    for game in games:
+        assert evaluate(game, Player.WHITE) == -evaluate(game, Player.BLACK)
+    assert evaluate.batch(games, Player.BLACK) == [evaluate(g, Player.BLACK) for g in games]
+    assert evaluate.batch(games) == [evaluate(g, g.active_player) for g in games]
+
+    # Only the weighted features count
+    evaluate.weights = Weights(**{**{name: 0 for name in FEATURES}, "mobility": 1})
+    game = games[-1]
+    expected = mobility(game.board, Player.WHITE) - mobility(game.board, Player.BLACK)
+    assert evaluate(game, Player.WHITE) == expected
+
+
+def test_alphabeta():
+    game = setup_game()
+    result = AlphaBeta(evaluate=Evaluator()).search(game, depth=2)
+    assert result.move in set(game.legal_moves)
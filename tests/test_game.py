@@ -1,5 +1,16 @@
+import random
+from array import array
+
 import pytest
-from yinsh.game import GameState, Move, MoveGenerator
+from yinsh.game import (
+    MAX_MOVES,
+    POSITION_SIZE,
+    GameState,
+    Move,
+    MoveGenerator,
+    decode_positions,
+    encode_positions,
+)
 from yinsh.helpers import valid_hexes
 from yinsh.types import Hex, IllegalMoveError, Marker, Player, Ring
 
@@ -17,6 +28,17 @@ class TestMove:
         assert move.is_play
         assert not move.is_starting
 
+    def test_remove(self):
+        row = [Hex(0, r) for r in range(5)]
+        move = Move.remove(row, Hex(1, 1))
+        assert move.src_hex == Hex(1, 1)
+        assert move.row == tuple(row)
+        assert move.is_removal
+        assert not move.is_play
+        assert not move.is_starting
+        assert move == Move.remove(row, Hex(1, 1))
+        assert move != Move.remove(row, Hex(1, 2))
+
     def test_place(self):
         move = Move.place(Hex(0, 0))
         assert isinstance(move, Move)
@@ -25,6 +47,17 @@ class TestMove:
         assert not move.is_play
         assert move.is_starting
 
+    def test_eq_across_kinds(self):
+        row = [Hex(0, r) for r in range(5)]
+        play = Move.play(Hex(1, 1), Hex(1, 2))
+        remove = Move.remove(row, Hex(1, 1))
+        place = Move.place(Hex(1, 1))
+        assert play != remove and remove != play
+        assert play != place and place != play
+        assert remove != place and place != remove
+        assert remove not in [play, place]
+        assert play not in {remove, place}
+
 
 class TestMoveGenerator:
     def generate_valid(self, game: GameState):
@@ -65,6 +98,27 @@ class TestMoveGenerator:
         game.make_move(Move.play(Hex(0, 1), Hex(0, -1)))
         assert set(MoveGenerator(game)) == set(self.generate_valid(game))
 
+    def test_ids(self):
+        removal = setup_game()
+        for r in range(5):
+            removal.board._grid[Hex(-2, r)] = Marker.WHITE
+        removal.next_player = Player.BLACK
+
+        played = setup_game()
+        rng = random.Random(0)
+        for _ in range(20):
+            played.make_move(rng.choice(list(played.legal_moves)))
+
+        buffer = array("H", bytes(2 * MAX_MOVES))
+        for game in [GameState.new_game(), setup_game(), removal, played]:
+            moves = list(game.legal_moves)
+            ids = list(game.legal_moves.ids())
+            assert ids == [move.id for move in moves]
+            assert len(set(ids)) == len(ids)
+            assert [Move.from_id(move_id, game.requires_setup) for move_id in ids] == moves
+            assert game.legal_moves.fill(buffer) == len(ids)
+            assert buffer[: len(ids)].tolist() == ids
+
 
 class TestGameState:
     def test_new_game(self):
@@ -102,6 +156,69 @@ class TestGameState:
         game.players.black.rings = 3
         assert game.outcome().winner == Player.BLACK
 
+    def test_winner(self):
+        game = setup_game()
+        assert game.winner is None
+        assert game.legal_moves.count()
+
+        # No moves are legal once a player has removed enough rings, even with rings left
+        game.players.black.rings = 3
+        assert game.winner == Player.BLACK
+        assert list(game.legal_moves) == []
+        assert not game.has_legal_move()
+        game.players.black.rings = 2
+        assert game.winner is None
+        assert game.has_legal_move()
+
+    def test_has_legal_move(self):
+        game = setup_game()
+        assert game.has_legal_move()
+        assert not game.is_over()
+
+        # A ring boxed in by rings and the edge has no moves
+        game = GameState.new_game()
+        for hex in [Hex(0, -4), Hex(-1, -3), Hex(-2, -3)]:
+            game.board._grid[hex] = Ring.BLACK
+        game.board._grid[Hex(-1, -4)] = Ring.WHITE
+        game.requires_setup = False
+        assert not game.has_legal_move()
+        assert game.is_over()
+        assert game.outcome().winner == "DRAW"
+
+        # Pending removals count as legal moves
+        game.board._grid[Hex(-1, -4)] = None
+        for r in range(5):
+            game.board._grid[Hex(-2, r)] = Marker.BLACK
+        assert game.has_legal_move()
+        assert all(move.is_removal for move in game.legal_moves)
+
+    def test_legal_move_cache(self):
+        game = setup_game()
+        moves = list(game.legal_moves)
+        assert game.legal_moves.count() == len(moves)
+        cached = game._legal_moves[2]
+        assert list(game.legal_moves) == moves
+        assert game._legal_moves[2] is cached
+        assert list(game.legal_moves.ids()) == [move.id for move in moves]
+        assert game._legal_moves[2] is cached
+
+        # Ids are generated without creating the moves
+        game.push(moves[0])
+        assert game.legal_moves.count() == len(game._legal_moves[1])
+        assert game._legal_moves[2] is None
+        game.pop()
+
+        # Changes through moves or directly to the game both clear the cache
+        game.push(moves[0])
+        assert set(game.legal_moves) == set(MoveGenerator(game)._generate_legal_moves())
+        game.pop()
+        assert list(game.legal_moves) == moves
+        game.next_player = game.next_player.other
+        assert set(game.legal_moves).isdisjoint(moves)
+        game.next_player = game.next_player.other
+        game.board._grid[Hex(0, -4)] = Ring.BLACK
+        assert list(game.legal_moves) != moves
+
     def test_make_move(self):
         # See test_board.py for move validation tests
         game = GameState.new_game()
@@ -149,6 +266,182 @@ class TestGameState:
         assert game.next_player == Player.WHITE
         assert game.board._grid[Hex(0, 0)] == Marker.BLACK  # Flipped marker
 
+    def test_removals(self):
+        game = setup_game()
+        for r in range(5):
+            game.board._grid[Hex(-2, r)] = Marker.BLACK
+        game.next_player = Player.WHITE  # Black moved last
+
+        moves = list(game.legal_moves)
+        assert len(moves) == 5  # One row with each of black's 5 rings
+        assert all(move.is_removal for move in moves)
+
+        game.make_move(moves[0])
+        assert game.players.black.rings == 1
+        assert game.board.markers == {}
+        assert game.next_player == Player.WHITE
+        assert all(move.is_play for move in game.legal_moves)
+
+        with pytest.raises(IllegalMoveError):
+            game.make_move(Move.remove([Hex(-2, r) for r in range(5)], Hex(0, 0)))
+
+    def test_copy(self):
+        game = setup_game()
+        copy = game.copy()
+        copy.make_move(Move.play(Hex(0, 0), Hex(0, -4)))
+        copy.players.white.rings = 2
+        assert game.board._grid[Hex(0, 0)] == Ring.WHITE
+        assert game.next_player == Player.WHITE
+        assert game.players.white.rings == 0
+
+    def test_push_pop(self):
+        rng = random.Random(0)
+        for _ in range(5):
+            game = GameState.new_game()
+            snapshots = []
+            while not game.is_over():
+                snapshots.append(snapshot(game))
+                game.push(rng.choice(list(game.legal_moves)))
+
+            while snapshots:
+                game.pop()
+                assert snapshot(game) == snapshots.pop()
+
+    def test_hash(self):
+        game = GameState.new_game()
+        empty = game.hash
+        game.make_move(Move.place(Hex(0, 0)))
+        assert game.hash != empty
+
+        # Same position reached by two move orders
+        game = setup_game()
+        other = game.copy()
+        game.make_move(Move.play(Hex(0, 0), Hex(0, -4)))
+        game.make_move(Move.play(Hex(1, 0), Hex(1, -3)))
+        game.make_move(Move.play(Hex(-1, 0), Hex(-1, -2)))
+        other.make_move(Move.play(Hex(-1, 0), Hex(-1, -2)))
+        other.make_move(Move.play(Hex(1, 0), Hex(1, -3)))
+        other.make_move(Move.play(Hex(0, 0), Hex(0, -4)))
+        assert game.hash == other.hash
+
+        # Side to move and removed rings are part of the key
+        key = game.hash
+        game.next_player = game.next_player.other
+        assert game.hash != key
+        game.next_player = game.next_player.other
+        game.players.white.rings = 1
+        assert game.hash != key
+
+    def test_bytes(self):
+        rng = random.Random(0)
+        games = [GameState.new_game("blitz")]
+        game = setup_game()
+        for _ in range(30):
+            moves = list(game.legal_moves)
+            if not moves or game.is_over():
+                break
+            game.make_move(rng.choice(moves))
+            games.append(game.copy())
+        game.players.black.rings = 2
+        games.append(game)
+
+        for game in games:
+            data = game.to_bytes()
+            assert len(data) == POSITION_SIZE
+            decoded = GameState.from_bytes(data)
+            assert snapshot(decoded) == snapshot(game)
+            assert decoded.variant == game.variant
+
+        decoded = decode_positions(encode_positions(games))
+        assert [snapshot(game) for game in decoded] == [snapshot(game) for game in games]
+
+        with pytest.raises(ValueError):
+            GameState.from_bytes(bytes(POSITION_SIZE - 1))
+        with pytest.raises(ValueError):
+            GameState.from_bytes(b"\x07" + bytes(POSITION_SIZE - 1))
+        with pytest.raises(ValueError, match="rings removed"):
+            GameState.from_bytes(bytes(POSITION_SIZE - 1) + b"\x04")
+        with pytest.raises(ValueError):
+            decode_positions(bytes(POSITION_SIZE + 1))
+
+    def test_parse_state(self):
+        state = {
+            "rings": {"white": 1, "black": 0},
+            "color": "b",
+            "grid": {"0": 1, "1": 3, "2": 0},
+            "variant": "standard",
+        }
+        game = GameState.parse_state(state)
+        assert game.players.white.rings == 1
+        assert game.next_player == Player.BLACK
+        assert game.board._ring_masks[Player.WHITE.value] == 1 << 0
+        assert game.board._marker_masks[Player.WHITE.value] == 1 << 1
+        assert game.requires_setup
+
+        for rings in (-1, 4, "1", True):
+            state["rings"]["black"] = rings
+            with pytest.raises(ValueError, match="rings removed"):
+                GameState.parse_state(state)
+        state["rings"]["black"] = 2
+        assert GameState.parse_state(state).players.black.rings == 2
+        state["variant"] = "blitz"
+        with pytest.raises(ValueError, match="rings removed"):
+            GameState.parse_state(state)
+
+    def test_symmetry(self):
+        rng = random.Random(0)
+        game = setup_game()
+        # Played until a row is completed, so rows and removals are mapped too
+        for _ in range(34):
+            game.make_move(rng.choice(list(game.legal_moves)))
+        assert any(game.board._rows)
+        moves = set(game.legal_moves)
+        canonical, symmetry = game.canonical()
+        assert canonical.hash == game.canonical_hash()[0] == min(
+            game.transform(s).hash for s in range(12)
+        )
+        assert game.transform(0).hash == game.hash
+        assert {move.transform(symmetry) for move in moves} == set(canonical.legal_moves)
+
+        for s in range(12):
+            image = game.transform(s)
+            assert image.board.hash == game.board.symmetric_hash(s)
+            for player in Player:
+                rows = {frozenset(row) for row in image.board.get_rows(player)}
+                assert rows == {
+                    frozenset(Move.place(hex).transform(s).src_hex for hex in row)
+                    for row in game.board.get_rows(player)
+                }
+            assert {move.transform(s) for move in moves} == set(image.legal_moves)
+            # Every image of a position has the same canonical form
+            assert image.canonical()[0].to_bytes() == canonical.to_bytes()
+
+        row = [Hex(0, r) for r in range(-4, 1)]
+        move = Move.remove(row, Hex(1, 1))
+        assert move.transform(6) == Move.remove([Hex(0, r) for r in range(4, -1, -1)], Hex(1, -2))
+        assert Move.place(Hex(1, -1)).transform(1) == Move.place(Hex(1, 0))
+
     def test_legal_moves(self):
         game = GameState.new_game()
         assert isinstance(game.legal_moves, MoveGenerator)
+
+
+def setup_game():
+    game = GameState.new_game()
+    game.make_move(Move.place(Hex(0, 0)))
+    game.make_move(Move.place(Hex(1, 0)))
+    for i in range(4):
+        game.make_move(Move.place(Hex(-1, i)))
+        game.make_move(Move.place(Hex(i, 1)))
+    return game
+
+
+def snapshot(game: GameState):
+    return (
+        dict(game.board._grid),
+        game.players.white.rings,
+        game.players.black.rings,
+        game.next_player,
+        game.requires_setup,
+        game.hash,
+    )
@@ -1,11 +1,30 @@
 from yinsh.helpers import (
+    between_masks,
+    cell_windows,
+    coordinate_index,
     distance,
     hex_lerp,
     hex_linedraw,
     hex_round,
+    inv_coordinate_index,
+    inverse_symmetries,
     lerp,
+    line_between,
+    move_dst,
+    move_passed,
+    move_src,
     neighbour,
+    num_cells,
+    num_move_ids,
+    popcount,
+    rays,
+    removal_base,
     straight_line,
+    symmetries,
+    transform_mask,
+    window_index,
+    window_masks,
+    windows,
 )
 from yinsh.types import Direction, Hex
 
@@ -67,3 +86,102 @@ def test_straight_line():
         Hex(0, 4),
     ]
     assert straight_line(Hex(-2, -3), Hex(4, 1)) is None
+
+
+def test_popcount():
+    assert popcount(0) == 0
+    assert popcount(0b1011) == 3
+    assert popcount(1 << num_cells - 1 | 1) == 2
+
+
+def test_rays():
+    center = coordinate_index[Hex(0, 0)]
+    assert rays[center][list(Direction).index(Direction.S)] == tuple(
+        coordinate_index[Hex(0, r)] for r in range(1, 5)
+    )
+    # Rays stop at the edge of the board
+    edge = coordinate_index[Hex(0, 4)]
+    assert rays[edge][list(Direction).index(Direction.S)] == ()
+    assert sum(len(ray) for cell_rays in rays for ray in cell_rays) > 0
+    for cell_rays in rays:
+        assert len(cell_rays) == len(Direction)
+
+
+def test_line_between():
+    src = coordinate_index[Hex(0, 0)]
+    dst = coordinate_index[Hex(0, 4)]
+    direction, between = line_between(src, dst)
+    assert direction == Direction.S
+    assert between == tuple(coordinate_index[Hex(0, r)] for r in range(1, 4))
+    assert between_masks[src * num_cells + dst] == sum(1 << i for i in between)
+
+    direction, between = line_between(dst, src)
+    assert direction == Direction.N
+    assert between == tuple(coordinate_index[Hex(0, r)] for r in range(3, 0, -1))
+
+    assert line_between(src, coordinate_index[Hex(1, 1)]) is None
+    assert line_between(src, src) is None
+
+    # Every straight line agrees with the float line drawing
+    for a, i in coordinate_index.items():
+        for b, j in coordinate_index.items():
+            if line_between(i, j) is not None:
+                assert straight_line(a, b) == hex_linedraw(a, b)
+
+
+def test_windows():
+    assert len(windows) == len(window_masks) == len(set(window_masks))
+    for window, mask in zip(windows, window_masks):
+        assert len(window) == 5
+        assert straight_line(inv(window[0]), inv(window[-1])) == [inv(i) for i in window]
+        assert mask == sum(1 << i for i in window)
+
+    for index, mask in enumerate(cell_windows):
+        assert mask == sum(1 << w for w, window in enumerate(windows) if index in window)
+    # The center lies on 5 windows along each of the 3 line orientations
+    assert bin(cell_windows[coordinate_index[Hex(0, 0)]]).count("1") == 15
+
+
+def test_move_tables():
+    assert num_move_ids < 2**16
+    for src in range(num_cells):
+        for dst in range(num_cells):
+            move_id = src * num_cells + dst
+            assert (move_src[move_id], move_dst[move_id]) == (src, dst)
+            line = line_between(src, dst)
+            assert move_passed[move_id] == (line[1] if line is not None else None)
+
+    for window, cells in enumerate(windows):
+        assert window_index[frozenset(reversed(cells))] == window
+        move_id = removal_base + window * num_cells + cells[0]
+        assert (move_src[move_id], move_dst[move_id]) == (cells[0], -1)
+        assert move_passed[move_id] == cells
+
+
+def test_symmetries():
+    assert len({tuple(permutation) for permutation in symmetries}) == 12
+    assert symmetries[0] == tuple(range(num_cells))
+    # The centre is the only cell every symmetry fixes
+    fixed = {i for i in range(num_cells) if all(p[i] == i for p in symmetries)}
+    assert fixed == {coordinate_index[Hex(0, 0)]}
+
+    centre = Hex(0, 0)
+    for permutation, inverse in zip(symmetries, inverse_symmetries):
+        assert sorted(permutation) == list(range(num_cells))
+        assert all(inverse[permutation[i]] == i for i in range(num_cells))
+        # Distances, and so lines and windows, are kept
+        for i in range(num_cells):
+            assert distance(inv(permutation[i]), centre) == distance(inv(i), centre)
+        assert {frozenset(permutation[i] for i in window) for window in windows} == set(
+            window_index
+        )
+
+    mask = window_masks[0] | 1 << coordinate_index[Hex(0, 0)]
+    for symmetry, permutation in enumerate(symmetries):
+        assert transform_mask(mask, symmetry) == sum(
+            1 << permutation[i] for i in range(num_cells) if mask >> i & 1
+        )
+
+
+def inv(index):
+    return inv_coordinate_index[index]
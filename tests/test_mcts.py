@@ -0,0 +1,81 @@
+import threading
+
+import pytest
+from yinsh.game import GameState, Move
+from yinsh.mcts import MCTS
+from yinsh.types import Hex, Marker, Player
+
+from tests.test_game import setup_game, snapshot
+
+
+class TestMCTS:
+    def test_search_setup(self):
+        game = GameState.new_game()
+        before = snapshot(game)
+        result = MCTS(seed=0).search(game, iterations=50)
+        assert snapshot(game) == before
+        assert result.move.is_starting
+        assert result.iterations == 50
+        assert result.visits == 50
+        assert sum(stats.visits for stats in result.moves) == 50
+        assert result.moves[0].move == result.move
+        assert result.pv[0] == result.move
+        assert 0 <= result.value <= 1
+
+    def test_search_play(self):
+        game = setup_game()
+        result = MCTS(seed=0).search(game, iterations=30)
+        assert result.move in set(game.legal_moves)
+        assert result.move.is_play
+
+    def test_search_removal(self):
+        game = setup_game()
+        for r in range(5):
+            game.board._grid[Hex(-2, r)] = Marker.WHITE
+        game.next_player = Player.BLACK  # White moved last
+
+        result = MCTS(seed=0).search(game, iterations=20)
+        assert result.move.is_removal
+        assert result.move in set(game.legal_moves)
+
+    def test_limits(self):
+        game = GameState.new_game()
+        with pytest.raises(ValueError):
+            MCTS().search(game)
+        with pytest.raises(ValueError):
+            MCTS().search(game, iterations=0, time_limit=1)
+        result = MCTS().search(game, time_limit=0.05)
+        assert result.iterations >= 1
+
+    def test_tree_reuse(self):
+        game = setup_game()
+        engine = MCTS(seed=0)
+        result = engine.search(game, iterations=200)
+
+        # Continue from the position after the best move and its most visited reply
+        game.make_move(result.pv[0])
+        game.make_move(result.pv[1])
+        best = next(child for child in engine.root.children if child.move == result.pv[0])
+        reply = max(best.children, key=lambda child: child.visits)
+        visits = reply.visits
+
+        result = engine.search(game, iterations=10)
+        assert engine.root is reply
+        assert result.visits == visits + 10
+
+        engine.advance(result.move)
+        assert engine.root.move == result.move
+        engine.advance(Move.place(Hex(0, 0)))
+        assert engine.root is None
+
+    def test_game_over(self):
+        game = setup_game()
+        game.players.white.rings = 3
+        with pytest.raises(ValueError):
+            MCTS().search(game, iterations=5)
+
+    def test_stop(self):
+        stop = threading.Event()
+        stop.set()
+        result = MCTS(seed=0).search(GameState.new_game(), iterations=1000, stop=stop)
+        assert result.iterations == 1
@@ -0,0 +1,35 @@
+from yinsh.game import GameState
+from yinsh.mcts import MoveStats, SearchResult
+from yinsh.parallel import ParallelMCTS, merge_results
+
+from tests.test_game import setup_game
+
+
+def test_merge_results():
+    a, b, c = list(setup_game().legal_moves)[:3]
+    first = SearchResult(a, 0.5, 10, 10, 0.1, [a], [MoveStats(a, 6, 0.5), MoveStats(b, 4, 0.25)])
+    second = SearchResult(b, 1.0, 10, 10, 0.1, [b, c], [MoveStats(b, 8, 1.0), MoveStats(c, 2, 0.0)])
+
+    result = merge_results([first, second], 0.2)
+    assert result.move == b
+    assert result.moves == [
+        MoveStats(b, 12, (4 * 0.25 + 8 * 1.0) / 12),
+        MoveStats(a, 6, 0.5),
+        MoveStats(c, 2, 0.0),
+    ]
+    assert result.pv == [b, c]
+    assert result.visits == result.iterations == 20
+
+
+def test_parallel_search():
+    game = GameState.new_game()
+    with ParallelMCTS(workers=2) as engine:
+        result = engine.search(game, iterations=20, seed=0)
+        assert result.iterations == 40
+        assert sum(stats.visits for stats in result.moves) == 40
+        assert result.move.is_starting
+
+        game.make_move(result.move)
+        result = engine.search(game, iterations=5, seed=1)
+        assert result.iterations == 10
+        assert result.move in set(game.legal_moves)
@@ -0,0 +1,35 @@
+import pytest
+from yinsh.perft import POSITIONS, load_position, main, perft, profile
+
+from tests.test_game import snapshot
+
+
+@pytest.mark.parametrize("name", list(POSITIONS))
+def test_perft(name):
+    game = load_position(name)
+    before = snapshot(game)
+    counts = POSITIONS[name][1]
+    for depth in (1, 2):
+        assert perft(game, depth) == counts[depth]
+    assert snapshot(game) == before
+
+
+def test_perft_removal_depth_3():
+    assert perft(load_position("removal"), 3) == POSITIONS["removal"][1][3]
+
+
+def test_profile():
+    game = load_position("removal")
+    leaves, stats = profile(game, 2)
+    assert leaves == POSITIONS["removal"][1][2]
+    # 5 removals from the root, then the ring moves after each of them
+    assert stats["removal"].nodes == 5
+    assert stats["play"].nodes == leaves
+    assert stats["setup"].nodes == 0
+    assert stats["play"].nodes_per_second > 0
+
+
+def test_main(capsys):
+    assert main(["--depth", "1", "start", "removal"]) == 0
+    output = capsys.readouterr().out
+    assert "start" in output and "removal" in output
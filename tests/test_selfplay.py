@@ -0,0 +1,75 @@
+import pytest
+from yinsh.game import GameState, Move
+from yinsh.helpers import inv_coordinate_index, windows
+from yinsh.types import Player
+
+np = pytest.importorskip("numpy")
+from yinsh.batch import encode  # noqa: E402
+from yinsh.selfplay import (  # noqa: E402
+    PLACE,
+    PLAY,
+    RECORD,
+    REMOVE,
+    RandomBot,
+    open_shards,
+    play_game,
+    self_play,
+)
+
+
+def test_play_game():
+    records = play_game(RandomBot(seed=0))
+    assert records.dtype == RECORD
+    assert (records["kind"][:10] == PLACE).all()
+    assert (records["kind"][10:] != PLACE).all()
+    assert len(np.unique(records["outcome"])) == 1
+    assert not records["truncated"].any()
+
+    # Replaying the recorded moves reproduces every recorded position
+    game = GameState.new_game()
+    for record in records:
+        assert (record["cells"] == encode(game)).all()
+        assert record["white"] == game.next_player.value
+        assert tuple(record["removed"]) == (game.players.black.rings, game.players.white.rings)
+
+        src = inv_coordinate_index[int(record["src"])]
+        if record["kind"] == PLACE:
+            game.make_move(Move.place(src))
+        elif record["kind"] == PLAY:
+            game.make_move(Move.play(src, inv_coordinate_index[int(record["dst"])]))
+        else:
+            assert record["kind"] == REMOVE
+            row = [inv_coordinate_index[index] for index in windows[record["row"]]]
+            game.make_move(Move.remove(row, src))
+
+    outcome = game.outcome()
+    expected = {Player.WHITE: 1, Player.BLACK: -1, "DRAW": 0}[outcome.winner] if outcome else 0
+    assert records["outcome"][0] == expected
+
+
+def test_truncated():
+    records = play_game(RandomBot(seed=0), max_moves=30)
+    assert len(records) == 30
+    assert records["truncated"].all()
+
+
+def test_self_play(tmp_path):
+    positions = self_play(tmp_path, games=4, bot=RandomBot(), workers=2, seed=0, max_moves=60)
+    shards = open_shards(tmp_path)
+    assert len(shards) == 2
+    assert sum(len(shard) for shard in shards) == positions
+    assert positions <= 4 * 60
+
+    # Later runs append new shards rather than overwrite
+    more = self_play(tmp_path, games=1, workers=1, seed=1, max_moves=20)
+    assert len(open_shards(tmp_path)) == 3
+    assert sum(len(shard) for shard in open_shards(tmp_path)) == positions + more
+
+
+def test_self_play_limits(tmp_path):
+    assert self_play(tmp_path, games=0) == 0
+    assert open_shards(tmp_path) == []
+    with pytest.raises(ValueError):
+        self_play(tmp_path, games=1, workers=0)
+    with pytest.raises(ValueError):
+        self_play(tmp_path, games=-1)
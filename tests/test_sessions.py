@@ -0,0 +1,126 @@
+import json
+import time
+from pathlib import Path
+
+import pytest
+from yinsh.game import GameState
+from yinsh.helpers import coordinate_index
+from yinsh.types import Hex, Player, Ring
+
+pytest.importorskip("fastapi")
+from web.sessions import Match, SessionStore, game_size  # noqa: E402
+
+
+def new_store(**options):
+    store = SessionStore(**options)
+    ids = [store.create(GameState.new_game(), Player.WHITE) for _ in range(3)]
+    return store, ids
+
+
+def test_lru_order():
+    store, ids = new_store(max_sessions=3)
+    # Using the oldest game makes the second the least recently used
+    assert store.get(ids[0]) is not None
+    store.create(GameState.new_game(), Player.BLACK)
+    assert ids[1] not in store
+    assert ids[0] in store and ids[2] in store
+    assert len(store) == 3
+
+
+def test_idle_expiry():
+    store, ids = new_store(idle_timeout=60)
+    store.get(ids[1]).last_used -= 120
+    assert store.get(ids[1]) is None
+    assert ids[1] not in store
+
+    # Idle games are also dropped when another is added
+    store._sessions[ids[0]].last_used -= 120
+    store.add(Match(GameState.new_game()))
+    assert ids[0] not in store
+    assert ids[2] in store
+
+
+def test_max_sessions():
+    store, ids = new_store(max_sessions=2)
+    assert ids[0] not in store
+    assert len(store) == 2
+
+
+def test_max_mb():
+    size = game_size(GameState.new_game())
+    store, ids = new_store(max_mb=2.5 * size / 2**20)
+    assert ids[0] not in store
+    assert len(store) == 2
+    assert store.size == 2 * size
+
+    # A single game is kept however large it is
+    store = SessionStore(max_mb=0)
+    game_id = store.create(GameState.new_game(), Player.WHITE)
+    assert game_id in store
+
+
+def test_size():
+    store, ids = new_store()
+    assert store.size == sum(store._sessions[game_id].size for game_id in ids)
+
+    # Generating the legal moves caches them, which is only counted by update
+    session = store.get(ids[0])
+    before = store.size
+    session.game.legal_moves.count()
+    assert store.size == before
+    store.update(ids[0])
+    assert store.size == before - game_size(GameState.new_game()) + session.size
+
+    store.discard(ids[0])
+    store.discard(ids[0])
+    store.update(ids[0])
+    assert store.size == sum(store._sessions[game_id].size for game_id in ids[1:])
+    for game_id in ids[1:]:
+        store.discard(game_id)
+    assert store.size == 0
+
+
+def test_invalid_ids():
+    store, ids = new_store()
+    for game_id in (None, 1, ["id"], {"id": ids[0]}, b"id", "missing"):
+        assert store.get(game_id) is None
+    assert len(store) == 3
+
+
+@pytest.fixture
+def client(monkeypatch):
+    pytest.importorskip("httpx")
+    # The app serves its static files from a path relative to the repository
+    monkeypatch.chdir(Path(__file__).parents[1])
+    from fastapi.testclient import TestClient
+    from web.main import app
+
+    return TestClient(app)
+
+
+def post(client, path: str, data):
+    response = client.post(path, content=json.dumps(data))
+    assert response.status_code == 200, response.text
+    return response.json()
+
+
+def test_requests_carry_only_id(client):
+    from web.helpers import sessions
+
+    data = post(client, "/new", {"color": "w"})
+    game_id = data["id"]
+    assert data["state"]["requiresSetup"]
+
+    # Placing a ring and asking for the bot's reply send only the game id and the action
+    post(client, "/place", {"id": game_id, "action": coordinate_index[Hex(0, 0)]})
+    data = post(client, "/bot", {"id": game_id, "timeLimit": 0.05})
+    # The grid holds a white and a black ring, and the server's game matches it
+    assert sorted(data["state"]["grid"].values()) == [1, 2]
+    board = sessions.get(game_id).game.board
+    assert board.rings[Hex(0, 0)] == Ring.WHITE
+    assert [bin(mask).count("1") for mask in board._ring_masks] == [1, 1]
+
+    response = client.post("/place", content=json.dumps({"action": 0}))
+    assert response.status_code == 404
+    response = client.post("/bot", content=json.dumps({"id": game_id, "timeLimit": 0.05}))
+    assert response.status_code == 409
@@ -0,0 +1,65 @@
+import pytest
+from yinsh.game import GameState, Move
+from yinsh.transposition import ENTRY_SIZE, Bound, Entry, TranspositionTable
+from yinsh.types import Hex
+
+
+class TestTranspositionTable:
+    def test_size(self):
+        table = TranspositionTable(size_mb=1)
+        assert table.size == 2**20 // ENTRY_SIZE
+
+    def test_store_probe(self):
+        table = TranspositionTable(size_mb=0.01)
+        game = GameState.new_game()
+        game.make_move(Move.place(Hex(0, 0)))
+
+        assert table.probe(game.hash) is None
+        assert table.store(game.hash, 0.5, 3, Bound.LOWER, move=7)
+        assert table.probe(game.hash) == Entry(0.5, Bound.LOWER, 3, 7)
+        assert table.stats["hits"] == 1
+        assert table.stats["misses"] == 1
+        assert table.stats["hit_rate"] == 0.5
+
+        table.clear()
+        assert table.probe(game.hash) is None
+
+    def test_replacement(self):
+        table = TranspositionTable(size_mb=0.001)
+        key = 12345
+        other = key + table.size  # Maps to the same slot
+
+        table.store(key, 1.0, 5)
+        # Shallower results don't replace deeper ones from the same search
+        assert not table.store(other, 2.0, 2)
+        assert table.probe(key).value == 1.0
+        assert table.probe(other) is None
+
+        # The same position is always updated
+        assert table.store(key, 3.0, 1)
+        assert table.probe(key) == Entry(3.0, Bound.EXACT, 1, -1)
+        assert table.stats["overwrites"] == 0
+
+        # Anything from an older search can be replaced
+        table.store(key, 1.0, 5)
+        table.new_search()
+        assert table.store(other, 2.0, 2)
+        assert table.probe(key) is None
+        assert table.probe(other).value == 2.0
+        assert table.stats["overwrites"] == 1
+
+    def test_shared(self):
+        table = TranspositionTable(size_mb=0.01, shared=True)
+        name = table.name
+        try:
+            other = TranspositionTable.attach(name)
+            assert other.size == table.size
+            table.store(42, -1.5, 4, Bound.UPPER, move=3)
+            assert other.probe(42) == Entry(-1.5, Bound.UPPER, 4, 3)
+            other.close()
+        finally:
+            table.close(unlink=True)
+
+        assert TranspositionTable(size_mb=0.01).name is None
+        with pytest.raises(FileNotFoundError):
+            TranspositionTable.attach(name)
@@ -1,5 +1,7 @@
+import pickle
+
 import pytest
-from yinsh.types import Direction, Hex, Marker, Player, Ring
+from yinsh.types import OFF_BOARD, Direction, Hex, Marker, Player, Ring, board_cells
 
 
 class TestHex:
@@ -21,6 +23,12 @@ class TestHex:
         with pytest.raises(TypeError):
             x - 4
 
+    def test_eq(self):
+        assert Hex(1, 0) == Hex(1, 0, -1)
+        assert Hex(1, 0) != Hex(0, 1)
+        assert Hex(1, 0) != None  # noqa: E711
+        assert Hex(1, 0) != (1, 0, -1)
+
     def test_scale(self):
         x = Hex(1, 0, -1)
         assert x.scale(4) == Hex(4, 0, -4)
@@ -48,6 +56,29 @@ class TestHex:
         y = Hex(1, -5)
         assert set(y.neighbours()) == set([Hex(0, -4), Hex(1, -4), Hex(2, -5)])
 
+    def test_interning(self):
+        assert len(board_cells) == 85
+        assert Hex(1, 0) is Hex(1, 0, -1)
+        assert Hex(1, 0) + Hex(0, 1) is Hex(1, 1)
+        assert Hex(1, 1) - Hex(0, 1) is Hex(1, 0)
+        assert Hex(0, 1).scale(3) is Hex(0, 3)
+        assert Direction.N.value is Hex(0, -1)
+        assert Hex(0.0, 2.0) is Hex(0, 2)
+        assert all(hex.index == i for i, hex in enumerate(board_cells))
+
+        # Off the board hexes are plain instances
+        x = Hex(4, 1) + Hex(1, 0)
+        assert x == Hex(5, 1)
+        assert x.index == OFF_BOARD
+        assert Hex(0.5, 0.5).index == OFF_BOARD
+
+        with pytest.raises(AttributeError):
+            x.other = None
+
+    def test_pickle(self):
+        assert pickle.loads(pickle.dumps(Hex(2, -1))) is Hex(2, -1)
+        assert pickle.loads(pickle.dumps(Hex(10, 10))) == Hex(10, 10)
+
 
 class TestPlayer:
     def test_enum(self):
@@ -0,0 +1,57 @@
+from collections import OrderedDict
+from typing import NamedTuple
+
+
+class CachedPosition(NamedTuple):
+    state: str  # JSON of the state sent to clients
+    rows: dict[str, list[list[int]]]
+    outcome: bool | str | None  # Player.value of the winner or "DRAW", None until the game ends
+
+
+class ResponseCache:
+    def __init__(self, max_entries: int = 4096):
+        """
+        Bounded LRU of serialised positions, keyed by position hash\n
+        The least recently used position is evicted once there are more than max_entries
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict[object, CachedPosition] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """Returns the position stored for key, or None if there is none"""
+        position = self._entries.get(key)
+        if position is None:
+            self.misses += 1
+            return
+        self.hits += 1
+        self._entries.move_to_end(key)
+        return position
+
+    def put(self, key, position: CachedPosition):
+        self._entries[key] = position
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def clear(self):
+        self._entries.clear()
+        self.hits = self.misses = self.evictions = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def stats(self):
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "evictions": self.evictions,
+        }
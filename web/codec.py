@@ -0,0 +1,102 @@
+from yinsh.game import GameState
+from yinsh.helpers import inv_coordinate_index, iter_bits, num_cells, removal_base, windows
+from yinsh.types import Hex, Marker, Ring
+
+content_index = {None: 0, Ring.WHITE: 1, Ring.BLACK: 2, Marker.WHITE: 3, Marker.BLACK: 4}
+
+# Interned board cells by coordinate index, as sent by clients
+_CELLS: tuple[Hex, ...] = tuple(inv_coordinate_index[index] for index in range(num_cells))
+
+# Pieces of the serialised state, built once so that a position is written by joining them.
+# _GRID_ENTRIES[code][index] is the grid entry of a cell holding content code
+_GRID_ENTRIES = [[f'"{index}": {code}' for index in range(num_cells)] for code in range(5)]
+_DST_KEYS = [f'"{index}": [' for index in range(num_cells)]
+_INDICES = [str(index) for index in range(num_cells)]
+_ROWS = [f"[{', '.join(map(str, window))}]" for window in windows]
+_BOOLS = ("false", "true")
+
+
+class DecodeError(ValueError):
+    """
+    Raised for a request body that can't be read, such as one missing a field
+    or with cells that aren't coordinate indices of the board
+    """
+
+
+def decode_cell(value):
+    """Returns the interned board cell for a coordinate index sent by a client"""
+    # bool is a subclass of int, but true and false aren't cells
+    if type(value) is not int or not 0 <= value < num_cells:
+        raise DecodeError(f"Invalid cell: {value!r}")
+    return _CELLS[value]
+
+
+def decode_row(values):
+    """Returns the interned board cells of a row of five coordinate indices"""
+    if not isinstance(values, list) or len(values) != 5:
+        raise DecodeError(f"Invalid row: {values!r}")
+    return [decode_cell(value) for value in values]
+
+
+def _dsts(game: GameState):
+    """
+    Serialised legal destinations of each ring the next player can move, by coordinate index,
+    from the ids of the game's cached legal moves
+    """
+    entries = []
+    src = None
+    for move_id in game.legal_moves.ids():
+        if move_id >= removal_base:
+            break  # Rows must be removed before any ring moves
+        ring, dst = divmod(move_id, num_cells)
+        if ring != src:
+            if src is not None:
+                entries.append("], ")
+            entries.append(_DST_KEYS[ring])
+            src = ring
+        else:
+            entries.append(", ")
+        entries.append(_INDICES[dst])
+    if src is not None:
+        entries.append("]")
+    return "".join(entries)
+
+
+def encode_state(game: GameState):
+    """
+    Serialises the state sent to clients in a single pass over the bitboards\n
+    Returns the JSON text and the completed rows of each player as lists of coordinate indices.
+    Cells are keyed by coordinate index and hold their content_index code
+    """
+    board = game.board
+    over = game.is_over()
+    black_rings, white_rings = board._ring_masks
+    black_markers, white_markers = board._marker_masks
+    grid = ", ".join(
+        entries[index]
+        for mask, entries in (
+            (white_rings, _GRID_ENTRIES[1]),
+            (black_rings, _GRID_ENTRIES[2]),
+            (white_markers, _GRID_ENTRIES[3]),
+            (black_markers, _GRID_ENTRIES[4]),
+        )
+        for index in iter_bits(mask)
+    )
+    white_rows = list(iter_bits(board._rows[1]))
+    black_rows = list(iter_bits(board._rows[0]))
+    dsts = "" if game.requires_setup or over else _dsts(game)
+
+    state = (
+        f'{{"grid": {{{grid}}}, '
+        f'"rings": {{"white": {game.players.white.rings}, "black": {game.players.black.rings}}}, '
+        f'"requiresSetup": {_BOOLS[game.requires_setup]}, '
+        f'"rows": {{"w": [{", ".join(_ROWS[row] for row in white_rows)}], '
+        f'"b": [{", ".join(_ROWS[row] for row in black_rows)}]}}, '
+        f'"dsts": {{{dsts}}}, '
+        f'"over": {_BOOLS[over]}}}'
+    )
+    rows = {
+        "w": [list(windows[row]) for row in white_rows],
+        "b": [list(windows[row]) for row in black_rows],
+    }
+    return state, rows
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import asyncio
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from multiprocessing import Manager
+from typing import Awaitable, Callable
+
+from yinsh.game import GameState
+from yinsh.mcts import MCTS
+
+# Seconds between checks for a disconnected client while work runs
+POLL_INTERVAL = 0.05
+# Extra seconds allowed past a time budget before the work is told to stop
+GRACE_PERIOD = 0.5
+# Most bot engines a worker process keeps, one per game, dropping the least recently used
+WORKER_ENGINES = 8
+
+# Engines of the current worker process by game id, kept between searches so that a game's
+# tree is reused whenever its next search runs in the same worker
+_engines: OrderedDict[str, MCTS] = OrderedDict()
+
+
+class Cancelled(Exception):
+    """
+    Raised when work is abandoned before it finishes\n
+    Work that has started can't be interrupted, so it keeps running until it next checks
+    its stop event
+    """
+
+
+def search_move(game: GameState, engine: MCTS | None, time_limit: float, stop):
+    """Finds the bot's move with engine, or with a new engine if it is None"""
+    if engine is None:
+        engine = MCTS()
+    return engine.search(game, time_limit=time_limit, stop=stop).move
+
+
+def search_worker_move(game: GameState, game_id: str | None, time_limit: float, stop):
+    """Finds the bot's move with the worker process's engine for game_id"""
+    engine = _engines.pop(game_id, None) or MCTS()
+    if game_id is not None:
+        _engines[game_id] = engine
+        while len(_engines) > WORKER_ENGINES:
+            _engines.popitem(last=False)
+    return search_move(game, engine, time_limit, stop)
+
+
+def _ping():
+    return os.getpid()
+
+
+class BotExecutor:
+    def __init__(self, kind: str = "thread", workers: int = 1):
+        """
+        Runs CPU-bound bot and analysis work off the event loop\n
+        kind is "thread" to use a thread pool, which keeps the event loop responsive,
+        or "process" to use a process pool, which also runs work on several cores at once.
+        The processes are started here, so the first requests don't wait for them
+        """
+        if kind == "thread":
+            self._manager = None
+            self._executor = ThreadPoolExecutor(max_workers=workers)
+        elif kind == "process":
+            # Events from a manager can be passed to and checked by other processes
+            self._manager = Manager()
+            self._executor = ProcessPoolExecutor(max_workers=workers)
+            # Processes are started on demand, so give every worker a task to bring it up now
+            for future in [self._executor.submit(_ping) for _ in range(workers)]:
+                future.result()
+        else:
+            raise ValueError("Executor kind must be 'thread' or 'process'")
+        self.kind = kind
+        self.workers = workers
+
+    @property
+    def shares_memory(self):
+        """Whether work runs in this process, so objects passed to it are shared, not copied"""
+        return self._manager is None
+
+    async def run(
+        self,
+        function: Callable,
+        *args,
+        time_limit: float,
+        is_disconnected: Callable[[], Awaitable[bool]] = None,
+    ):
+        """
+        Calls function(*args, time_limit, stop) in the executor and waits for its result\n
+        function should finish within time_limit seconds and return early once the stop
+        event is set. stop is set when is_disconnected reports that the client has gone,
+        or when the time limit is overrun, and Cancelled is raised without waiting
+        for function to return
+        """
+        stop = self._manager.Event() if self._manager is not None else threading.Event()
+        loop = asyncio.get_running_loop()
+        future = loop.run_in_executor(self._executor, function, *args, time_limit, stop)
+        deadline = loop.time() + time_limit + GRACE_PERIOD
+
+        while True:
+            done, _ = await asyncio.wait({future}, timeout=POLL_INTERVAL)
+            if done:
+                return future.result()
+            if loop.time() > deadline or (
+                is_disconnected is not None and await is_disconnected()
+            ):
+                stop.set()
+                future.cancel()  # Only prevents work that is still queued from starting
+                raise Cancelled
+
+    def close(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        if self._manager is not None:
+            self._manager.shutdown()
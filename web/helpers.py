@@ -1,16 +1,65 @@
 import json
+import math
+import os
 from random import choice
 
 from yinsh.game import GameState, Move
-from yinsh.helpers import coordinate_index
-from yinsh.types import Hex, IllegalMoveError, Marker, Player, Ring
+from yinsh.mcts import MCTS
+from yinsh.types import Hex, IllegalMoveError, Player
 
-content_index = {None: 0, Ring.WHITE: 1, Ring.BLACK: 2, Marker.WHITE: 3, Marker.BLACK: 4}
-inv_content_index = {v: k for k, v in content_index.items()}
+from web.cache import CachedPosition, ResponseCache
+from web.codec import DecodeError, decode_cell, decode_row, encode_state
+from web.executor import BotExecutor, search_move, search_worker_move
+from web.sessions import Match, Session, SessionStore
 
+# Longest search per bot move in seconds. Requests may ask for less, down to MIN_BOT_TIME_LIMIT
+BOT_TIME_LIMIT = 1.0
+MIN_BOT_TIME_LIMIT = 0.05
 
-def handle_place(hex: Hex, game: GameState):
-    if game.is_over() or not game.requires_setup:
+# Bot searches run on YINSH_BOT_EXECUTOR ("thread" or "process") with YINSH_BOT_WORKERS workers.
+# Each game's engine keeps its search tree between the bot's moves. With processes, each worker
+# keeps the engines of the games it last searched, so trees are reused when a game returns to it
+BOT_EXECUTOR = os.environ.get("YINSH_BOT_EXECUTOR", "thread")
+BOT_WORKERS = int(os.environ.get("YINSH_BOT_WORKERS", 1))
+executor = BotExecutor(BOT_EXECUTOR, BOT_WORKERS)
+
+# Opening book for the bot's ring placements, written by python -m yinsh.book
+BOOK_PATH = os.environ.get("YINSH_BOOK")
+book = None
+if BOOK_PATH:
+    from yinsh.book import OpeningBook
+
+    book = OpeningBook(BOOK_PATH)
+
+# Serialised positions, which repeat across games and requests
+cache = ResponseCache(int(os.environ.get("YINSH_CACHE_SIZE", 4096)))
+
+# Games in progress, held on the server so requests only need to carry the game id and action
+sessions = SessionStore(
+    max_sessions=int(os.environ.get("YINSH_MAX_SESSIONS", 10_000)),
+    idle_timeout=float(os.environ.get("YINSH_SESSION_TIMEOUT", 3600)),
+    max_mb=float(os.environ.get("YINSH_SESSION_MEMORY_MB", 64)),
+)
+
+
+def new_game(data: dict):
+    color = require_field(data, "color")
+    if color not in ("w", "b"):
+        raise DecodeError(f"Invalid color: {color!r}")
+    player = Player.WHITE if color == "w" else Player.BLACK
+    game = parse_variant(data)
+    game_id = sessions.create(game, player)
+    return dump_data(game, game_id)
+
+
+def is_players_turn(session: Session):
+    game = session.game
+    return session.row is None and not game.is_over() and game.active_player == session.player
+
+
+def handle_place(hex: Hex, session: Session):
+    game = session.game
+    if not is_players_turn(session) or not game.requires_setup:
         return
     move = Move.place(hex)
     try:
@@ -20,99 +69,224 @@ def handle_place(hex: Hex, game: GameState):
         return
 
 
-def handle_play(src_hex: Hex, dst_hex: Hex, game: GameState):
-    if game.is_over() or game.requires_setup:
+def handle_play(src_hex: Hex, dst_hex: Hex, session: Session):
+    game = session.game
+    if not is_players_turn(session) or game.requires_setup:
         return
     move = Move.play(src_hex, dst_hex)
-    try:
-        game.make_move(move)
-        return dump_data(game)
-    except IllegalMoveError:
+    if move not in set(game.legal_moves):
         return
+    game.make_move(move)
+    return dump_data(game)
 
 
-def handle_dsts(hex: Hex, game: GameState):
-    if game.is_over() or game.requires_setup:
+async def handle_bot(
+    session: Session,
+    time_limit: float = BOT_TIME_LIMIT,
+    is_disconnected=None,
+    game_id: str = None,
+):
+    """
+    Makes the bot's move from the opening book, or searches for it in the executor\n
+    In a process pool the search uses the worker's engine for game_id.
+    Raises web.executor.Cancelled if the client disconnects first
+    """
+    game = session.game
+    if game.is_over() or game.active_player != session.bot:
         return
-    valid_dsts = [
-        coordinate_index[move.dst_hex] for move in game.legal_moves if move.src_hex == hex
-    ]
-    if valid_dsts:
-        return json.dumps(valid_dsts)
-
-
-def handle_bot(game: GameState):
-    game.next_player = game.next_player.other  # Flip to bot
-    move = choice(list(game.legal_moves))
+    entry = book.lookup(game) if book is not None else None
+    if entry is not None:
+        game.make_move(entry.move)
+        return dump_data(game)
+    key = game.hash
+    time_limit = min(time_limit, BOT_TIME_LIMIT)
+    if executor.shares_memory:
+        # The engine is taken from the session while it searches, so that a concurrent
+        # request for the same game searches with a new engine instead
+        engine, session.engine = session.engine or MCTS(), None
+        move = await executor.run(
+            search_move, game.copy(), engine, time_limit=time_limit, is_disconnected=is_disconnected
+        )
+        # An abandoned search may still be running, so its engine is only kept after it returns
+        session.engine = engine
+    else:
+        move = await executor.run(
+            search_worker_move,
+            game.copy(),
+            game_id,
+            time_limit=time_limit,
+            is_disconnected=is_disconnected,
+        )
+    if game.hash != key:
+        return  # Another request changed the game during the search
     game.make_move(move)
     return dump_data(game)
 
 
-def handle_bot_row(game: GameState):
-    game.next_player = game.next_player.other  # Flip to bot
-    row = choice(game.board.get_rows(game.next_player))
-    hex = choice(
-        [hex for hex in game.board.rings if game.board.rings[hex].value == game.next_player.value]
-    )
-    game.complete_row(row)
-    game.remove_ring(hex)
+def handle_bot_row(session: Session):
+    game = session.game
+    if game.is_over() or game.active_player != session.bot:
+        return
+    moves = list(game.legal_moves)
+    if not moves[0].is_removal:
+        return
+    game.make_move(choice(moves))
     return dump_data(game)
 
 
-def handle_row(data: dict):
-    row = [Hex(*hex.values()) for hex in data["row"]]
-    game = GameState.parse_state(data["state"])
-    game.complete_row(row)
-    return dump_data(game)
+def handle_row(row: list[Hex], session: Session):
+    """Holds the player's chosen row until they pick the ring to remove with it"""
+    game = session.game
+    if not is_players_turn(session) or game.requires_setup:
+        return
+    rows = get_position(game).rows["w" if session.player.value else "b"]
+    if {hex.index for hex in row} not in [set(completed) for completed in rows]:
+        return
+    session.row = row
+    preview = game.copy()
+    preview.complete_row(row)
+    return dump_data(preview)
 
 
-def handle_ring(hex: Hex, game: GameState):
-    game.remove_ring(hex)
+def handle_ring(hex: Hex, session: Session):
+    game = session.game
+    if session.row is None:
+        return
+    try:
+        game.make_move(Move.remove(session.row, hex))
+    except IllegalMoveError:
+        return
+    session.row = None
     return dump_data(game)
 
 
-def get_rows(game: GameState):
-    white = [[coordinate_index[hex] for hex in row] for row in game.board.get_rows(Player.WHITE)]
-    black = [[coordinate_index[hex] for hex in row] for row in game.board.get_rows(Player.BLACK)]
-    return {"w": white, "b": black}
-
-
 def get_outcome(game: GameState):
-    outcome = game.outcome()
+    outcome = get_position(game).outcome
     if outcome is None:
         return
-    if outcome.winner == "DRAW":
-        return json.dumps(outcome.winner)
-    return json.dumps(outcome.winner.value)
+    return json.dumps(outcome)
+
+
+def require_object(value):
+    """Raises DecodeError unless a request body, or an object within one, is a JSON object"""
+    if not isinstance(value, dict):
+        raise DecodeError(f"Expected an object: {value!r}")
+
+
+def require_field(data: dict, key: str):
+    """Returns data[key] from a request body, raising DecodeError if it isn't there"""
+    require_object(data)
+    if key not in data:
+        raise DecodeError(f"Missing field: {key}")
+    return data[key]
+
+
+def parse_variant(data: dict):
+    """Starts a game of the variant a request asks for, standard unless given"""
+    require_object(data)
+    variant = data.get("variant", "standard")
+    if variant not in ("standard", "blitz"):
+        raise DecodeError(f"Invalid variant: {variant!r}")
+    return GameState.new_game(variant)
 
 
 def parse_data(data: dict):
+    require_object(data)
     hex = data.get("action")
     if hex is not None:
-        hex = Hex(*hex.values())
-    game = GameState.parse_state(data["state"])
-    return hex, game
+        hex = decode_cell(hex)
+    return hex, sessions.get(data.get("id"))
+
+
+def parse_time_limit(data: dict):
+    """
+    Reads the seconds a bot request allows for its move, clamped to the allowed range\n
+    Returns None unless it is a positive number
+    """
+    value = data.get("timeLimit", BOT_TIME_LIMIT)
+    if type(value) not in (int, float) or not math.isfinite(value) or value <= 0:
+        return
+    return min(max(value, MIN_BOT_TIME_LIMIT), BOT_TIME_LIMIT)
 
 
 def parse_play_data(data: dict):
-    action = data["action"]
-    src_hex = Hex(*action["src"].values())
-    dst_hex = Hex(*action["dst"].values())
-    game = GameState.parse_state(data["state"])
-    return src_hex, dst_hex, game
+    action = require_field(data, "action")
+    src_hex = decode_cell(require_field(action, "src"))
+    dst_hex = decode_cell(require_field(action, "dst"))
+    return src_hex, dst_hex, sessions.get(data.get("id"))
 
 
-def dump_data(game: GameState):
-    grid = {
-        coordinate_index[hex]: content_index[content] for hex, content in game.board._grid.items()
-    }
+def parse_row_data(data: dict):
+    row = decode_row(require_field(data, "row"))
+    return row, sessions.get(data.get("id"))
+
+
+def get_position(game: GameState):
+    """Returns the serialised state, rows and outcome of game, from the cache if possible"""
+    key = (game.hash, game.variant)
+    position = cache.get(key)
+    if position is None:
+        state, rows = encode_state(game)
+        outcome = None
+        if game.is_over():
+            winner = game.outcome().winner
+            outcome = winner if winner == "DRAW" else winner.value
+        position = CachedPosition(state, rows, outcome)
+        cache.put(key, position)
+    return position
+
+
+def dump_data(game: GameState, game_id: str = None):
+    state = get_position(game).state
+    if game_id is not None:
+        return f'{{"state": {state}, "id": {json.dumps(game_id)}}}'
+    return f'{{"state": {state}}}'
+
+
+def new_match(data: dict):
+    game = parse_variant(data)
+    return json.dumps({"id": sessions.add(Match(game))})
+
+
+def dump_match(match: Match):
+    """Message sent to both players of a match after every change"""
+    game = match.game
+    position = get_position(game)
+    over = position.outcome is not None
     data = {
-        "state": {
-            "grid": grid,
-            "rings": {"white": game.players.white.rings, "black": game.players.black.rings},
-            "requiresSetup": game.requires_setup,
-            "rows": get_rows(game),
-            "over": game.is_over(),
-        }
+        "type": "state",
+        "turn": None if over else "w" if game.active_player.value else "b",
+        "players": ["w" if player.value else "b" for player in match.connections],
     }
-    return json.dumps(data)
+    if over:
+        data["outcome"] = position.outcome
+    # The state is already serialised, so it is added to the end of the message as it is
+    return f'{json.dumps(data)[:-1]}, "state": {position.state}}}'
+
+
+def parse_move(data: dict):
+    """Reads a move sent over a WebSocket, returning None if it is malformed"""
+    try:
+        if data.get("type") == "place":
+            return Move.place(decode_cell(data["hex"]))
+        elif data.get("type") == "play":
+            return Move.play(decode_cell(data["src"]), decode_cell(data["dst"]))
+        elif data.get("type") == "remove":
+            return Move.remove(decode_row(data["row"]), decode_cell(data["ring"]))
+    except (KeyError, TypeError, AttributeError, ValueError):
+        return
+
+
+def handle_match_move(match: Match, player: Player, data: dict):
+    """Makes a move for player, returning an error message if it isn't allowed"""
+    game = match.game
+    if len(match.connections) < 2:
+        return "Waiting for opponent"
+    if game.is_over():
+        return "Game is over"
+    if game.active_player != player:
+        return "Not your turn"
+    move = parse_move(data)
+    if move is None or move not in set(game.legal_moves):
+        return "Illegal move"
+    game.make_move(move)
@@ -1,22 +1,45 @@
-from fastapi import FastAPI, HTTPException, Request
-from fastapi.responses import HTMLResponse, JSONResponse
+import asyncio
+import json
+from contextlib import asynccontextmanager
+
+from fastapi import FastAPI, HTTPException, Request, WebSocket, WebSocketDisconnect
+from fastapi.responses import HTMLResponse, JSONResponse, Response
 from fastapi.staticfiles import StaticFiles
 from fastapi.templating import Jinja2Templates
 
+from web.codec import DecodeError
+from web.executor import Cancelled
 from web.helpers import (
+    cache,
+    dump_match,
+    executor,
     get_outcome,
     handle_bot,
     handle_bot_row,
-    handle_dsts,
+    handle_match_move,
     handle_place,
     handle_play,
     handle_ring,
     handle_row,
+    new_game,
+    new_match,
     parse_data,
     parse_play_data,
+    parse_row_data,
+    parse_time_limit,
+    sessions,
 )
+from web.sessions import Match, Session
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    yield
+    # Stops the bot's worker threads or processes when the server shuts down
+    executor.close()
+
 
-app = FastAPI()
+app = FastAPI(lifespan=lifespan)
 
 app.mount("/static", StaticFiles(directory="web/static"), name="static")
 templates = Jinja2Templates(directory="web/templates")
@@ -27,72 +50,174 @@ async def root(request: Request):
     return templates.TemplateResponse("index.html", {"request": request})
 
 
+@app.exception_handler(DecodeError)
+async def decode_error(request: Request, error: DecodeError):
+    return JSONResponse({"detail": str(error)}, status_code=400)
+
+
+def json_response(content: str):
+    """Sends JSON that has already been serialised, without encoding it again"""
+    return Response(content, media_type="application/json")
+
+
+def require_session(session: Session | None):
+    if session is None:
+        raise HTTPException(404, "Game not found")
+    return session
+
+
+@app.get("/cache-stats", response_class=JSONResponse)
+async def cache_stats():
+    return JSONResponse(cache.stats)
+
+
+@app.post("/new", response_class=JSONResponse)
+async def new(request: Request):
+    data = await request.json()
+    return json_response(new_game(data))
+
+
 @app.post("/bot", response_class=JSONResponse)
 async def bot(request: Request):
     data = await request.json()
-    _, game = parse_data(data)
-    response_data = handle_bot(game)
-    return JSONResponse(response_data)
+    _, session = parse_data(data)
+    time_limit = parse_time_limit(data)
+    if time_limit is None:
+        raise HTTPException(400, "timeLimit must be a positive number of seconds")
+    try:
+        response_data = await handle_bot(
+            require_session(session), time_limit, request.is_disconnected, data["id"]
+        )
+    except Cancelled:
+        raise HTTPException(503, "Bot move abandoned")
+    if response_data is None:
+        raise HTTPException(409, "Not the bot's turn")
+    sessions.update(data["id"])
+    return json_response(response_data)
 
 
 @app.post("/bot-row", response_class=JSONResponse)
 async def bot_row(request: Request):
     data = await request.json()
-    _, game = parse_data(data)
-    response_data = handle_bot_row(game)
-    return JSONResponse(response_data)
+    _, session = parse_data(data)
+    response_data = handle_bot_row(require_session(session))
+    if response_data is None:
+        raise HTTPException(409, "Bot has no row to remove")
+    sessions.update(data["id"])
+    return json_response(response_data)
 
 
 @app.post("/place", response_class=JSONResponse)
 async def place(request: Request):
     data = await request.json()
-    response_data = handle_place(*parse_data(data))
-    if response_data is None:
-        raise HTTPException(409, "Action not valid for given state")
-    return JSONResponse(response_data)
-
-
-@app.post("/play-src", response_class=JSONResponse)
-async def play_src(request: Request):
-    data = await request.json()
-    response_data = handle_dsts(*parse_data(data))
+    hex, session = parse_data(data)
+    response_data = handle_place(hex, require_session(session))
     if response_data is None:
         raise HTTPException(409, "Action not valid for given state")
-    return JSONResponse(response_data)
+    sessions.update(data["id"])
+    return json_response(response_data)
 
 
 @app.post("/play-dst", response_class=JSONResponse)
 async def play_dst(request: Request):
     data = await request.json()
-    response_data = handle_play(*parse_play_data(data))
+    src_hex, dst_hex, session = parse_play_data(data)
+    response_data = handle_play(src_hex, dst_hex, require_session(session))
     if response_data is None:
         raise HTTPException(409, "Action not valid for given state")
-    return JSONResponse(response_data)
+    sessions.update(data["id"])
+    return json_response(response_data)
 
 
 @app.post("/row", response_class=JSONResponse)
 async def row(request: Request):
     data = await request.json()
-    response_data = handle_row(data)
+    row, session = parse_row_data(data)
+    response_data = handle_row(row, require_session(session))
     if response_data is None:
         raise HTTPException(409, "Action not valid for given state")
-    return JSONResponse(response_data)
+    sessions.update(data["id"])
+    return json_response(response_data)
 
 
 @app.post("/ring", response_class=JSONResponse)
 async def ring(request: Request):
     data = await request.json()
-    response_data = handle_ring(*parse_data(data))
+    hex, session = parse_data(data)
+    response_data = handle_ring(hex, require_session(session))
     if response_data is None:
         raise HTTPException(409, "Action not valid for given state")
-    return JSONResponse(response_data)
+    sessions.update(data["id"])
+    return json_response(response_data)
 
 
 @app.post("/outcome", response_class=JSONResponse)
 async def outcome(request: Request):
     data = await request.json()
-    _, game = parse_data(data)
-    response_data = get_outcome(game)
+    _, session = parse_data(data)
+    session = require_session(session)
+    response_data = get_outcome(session.game)
     if response_data is None:
         raise HTTPException(409, "Game not over")
-    return JSONResponse(response_data)
+    sessions.discard(data["id"])
+    return json_response(response_data)
+
+
+@app.post("/match", response_class=JSONResponse)
+async def match(request: Request):
+    data = await request.json()
+    return json_response(new_match(data))
+
+
+async def broadcast(match: Match, message: str):
+    await asyncio.gather(
+        *(websocket.send_text(message) for websocket in match.connections.values()),
+        return_exceptions=True,
+    )
+
+
+@app.websocket("/ws/{game_id}")
+async def play_match(websocket: WebSocket, game_id: str):
+    """
+    Connection of one player to a match created with /match\n
+    The first player to connect plays white and the second black. Moves are sent as
+    {"type": "place", "hex": cell}, {"type": "play", "src": cell, "dst": cell}
+    or {"type": "remove", "row": [cell, ...], "ring": cell}, with cells given by coordinate index.
+    Both players are sent the new state after every move, and an error goes only
+    to the player whose move was refused
+    """
+    match = sessions.get(game_id)
+    player = match.free_player() if isinstance(match, Match) else None
+    if player is None:
+        await websocket.close(code=4404)
+        return
+
+    # The seat is taken before awaiting anything, so that a connection arriving meanwhile
+    # sees it as taken instead of being given the same side
+    match.connections[player] = websocket
+    try:
+        await websocket.accept()
+        await websocket.send_json({"type": "joined", "color": "w" if player.value else "b"})
+        await broadcast(match, dump_match(match))
+
+        while True:
+            try:
+                data = json.loads(await websocket.receive_text())
+            except ValueError:
+                data = {}
+            sessions.get(game_id)  # Keeps the match from expiring while it is played
+            error = handle_match_move(match, player, data)
+            if error is not None:
+                await websocket.send_json({"type": "error", "message": error})
+            else:
+                sessions.update(game_id)
+                await broadcast(match, dump_match(match))
+    except WebSocketDisconnect:
+        pass
+    finally:
+        # Frees the seat however the connection ended, including before it was accepted
+        del match.connections[player]
+        if match.connections:
+            await broadcast(match, dump_match(match))
+        elif match.game.is_over():
+            sessions.discard(game_id)
@@ -0,0 +1,148 @@
+from __future__ import annotations
+
+import secrets
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+
+from fastapi import WebSocket
+from yinsh.game import GameState
+from yinsh.mcts import MCTS
+from yinsh.types import Hex, Player
+
+# Rough memory use of a live game, of each legal move id and move it has cached
+# and of each node of a bot's search tree
+_GAME_BYTES = 1200
+_ID_BYTES = 36
+_MOVE_BYTES = 120
+_NODE_BYTES = 500
+
+
+def game_size(game: GameState):
+    """Approximate bytes held by a live game"""
+    cached = game._legal_moves
+    if cached is None:
+        return _GAME_BYTES
+    _, ids, moves = cached
+    return _GAME_BYTES + len(ids) * (_ID_BYTES + (_MOVE_BYTES if moves is not None else 0))
+
+
+@dataclass
+class Session:
+    game: GameState
+    player: Player  # Side played by the human
+    last_used: float = field(default_factory=time.monotonic)
+    row: list[Hex] | None = None  # Row chosen by the player, waiting for a ring to remove
+    engine: MCTS | None = None  # Bot's engine, keeping its search tree between moves
+
+    @property
+    def bot(self):
+        return self.player.other
+
+    @property
+    def size(self):
+        size = game_size(self.game)
+        if self.engine is not None and self.engine.root is not None:
+            # Each search iteration through the root adds at most one node
+            size += _NODE_BYTES * self.engine.root.visits
+        return size
+
+
+@dataclass
+class Match:
+    """Game between two people, each connected over a WebSocket"""
+
+    game: GameState
+    connections: dict[Player, WebSocket] = field(default_factory=dict)
+    last_used: float = field(default_factory=time.monotonic)
+
+    @property
+    def size(self):
+        return game_size(self.game)
+
+    def free_player(self):
+        """Returns the side nobody is connected as, white first, or None if both are taken"""
+        for player in (Player.WHITE, Player.BLACK):
+            if player not in self.connections:
+                return player
+
+
+class SessionStore:
+    def __init__(self, max_sessions: int = 10_000, idle_timeout: float = 3600, max_mb: float = 64):
+        """
+        Live games kept on the server, keyed by game id, either against the bot or a Match\n
+        Games unused for idle_timeout seconds are dropped, and the least recently used games
+        are evicted once there are more than max_sessions or their approximate memory use
+        passes max_mb
+        """
+        self.max_sessions = max_sessions
+        self.idle_timeout = idle_timeout
+        self.max_bytes = max_mb * 2**20
+        self._sessions: OrderedDict[str, Session | Match] = OrderedDict()
+        # Size of each session when it was last counted, and their total
+        self._sizes: dict[str, int] = {}
+        self._bytes = 0
+
+    def create(self, game: GameState, player: Player):
+        """Stores a new game against the bot and returns its id"""
+        return self.add(Session(game, player))
+
+    def add(self, session: Session | Match):
+        """Stores a session and returns its new id"""
+        game_id = secrets.token_urlsafe(16)
+        self._sessions[game_id] = session
+        self._count(game_id)
+        self._evict()
+        return game_id
+
+    def get(self, game_id: str):
+        """Returns the session for game_id, or None if it has expired or isn't a stored id"""
+        if type(game_id) is not str:
+            return
+        session = self._sessions.get(game_id)
+        if session is None:
+            return
+        now = time.monotonic()
+        if now - session.last_used > self.idle_timeout:
+            self.discard(game_id)
+            return
+        session.last_used = now
+        self._sessions.move_to_end(game_id)
+        return session
+
+    def update(self, game_id: str):
+        """Recounts the size of a session after it has changed, evicting others if needed"""
+        if game_id in self._sessions:
+            self._count(game_id)
+            self._evict()
+
+    def discard(self, game_id: str):
+        self._sessions.pop(game_id, None)
+        self._bytes -= self._sizes.pop(game_id, 0)
+
+    @property
+    def size(self):
+        """Approximate bytes held by the stored sessions"""
+        return self._bytes
+
+    def __len__(self):
+        return len(self._sessions)
+
+    def __contains__(self, game_id: str):
+        return game_id in self._sessions
+
+    def _count(self, game_id: str):
+        size = self._sessions[game_id].size
+        self._bytes += size - self._sizes.get(game_id, 0)
+        self._sizes[game_id] = size
+
+    def _evict(self):
+        # Sessions are kept in order of use, so idle ones are always at the front
+        deadline = time.monotonic() - self.idle_timeout
+        while self._sessions and next(iter(self._sessions.values())).last_used < deadline:
+            self.discard(next(iter(self._sessions)))
+
+        while len(self._sessions) > self.max_sessions or (
+            self._bytes > self.max_bytes and len(self._sessions) > 1
+        ):
+            self.discard(next(iter(self._sessions)))
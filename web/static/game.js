@@ -2,12 +2,14 @@ let playerTurn;
 let color;
 let variant;
 let state = {
+  id: null,
   grid: {},
   color: color,
   variant: variant,
   rings: { white: 0, black: 0 },
   requiresSetup: true,
   rows: { w: [], b: [] },
+  dsts: {},
 };
 let playHex = {};
 let validDsts = [];
@@ -17,15 +19,32 @@ function runGame() {
 
   state.variant = document.querySelector("input[name='variant']:checked").value;
 
-  canvas.addEventListener("click", handleClick);
   if (!playerTurn) {
     state.color = "b";
     state.botColor = "w";
-    botTurn();
   } else {
     state.color = "w";
     state.botColor = "b";
   }
+
+  let game = { color: state.color, variant: state.variant };
+  fetch("/new", { method: "POST", body: JSON.stringify(game) })
+    .then((response) => {
+      if (!response.ok) {
+        throw new Error("Invalid response");
+      }
+      return response.json();
+    })
+    .then((data) => {
+      state.id = data.id;
+      canvas.addEventListener("click", handleClick);
+      if (!playerTurn) {
+        botTurn();
+      }
+    })
+    .catch((error) => {
+      console.error("Could not start game", error);
+    });
 }
 
 function handleClick(e) {
@@ -44,8 +63,13 @@ function handleClick(e) {
   }
 }
 
+// Cells are sent to the server by coordinate index
+function cellIndex(hex) {
+  return invGridIndex.findIndex((h) => h.q == hex.q && h.r == hex.r);
+}
+
 function placeMove(hex) {
-  let game = { action: hex, state: state };
+  let game = { id: state.id, action: cellIndex(hex) };
   fetch("/place", { method: "POST", body: JSON.stringify(game) })
     .then((response) => {
       if (!response.ok) {
@@ -54,10 +78,10 @@ function placeMove(hex) {
       return response.json();
     })
     .then((data) => {
-      let game = JSON.parse(data);
-      state.grid = game.state.grid;
-      state.over = game.state.over;
-      state.requiresSetup = game.state.requiresSetup;
+      state.grid = data.state.grid;
+      state.over = data.state.over;
+      state.dsts = data.state.dsts;
+      state.requiresSetup = data.state.requiresSetup;
       endTurn();
     })
     .catch((error) => {
@@ -67,7 +91,10 @@ function placeMove(hex) {
 }
 
 function playMove(srcHex, dstHex) {
-  let game = { action: { src: srcHex, dst: dstHex }, state: state };
+  let game = {
+    id: state.id,
+    action: { src: cellIndex(srcHex), dst: cellIndex(dstHex) },
+  };
   fetch("/play-dst", { method: "POST", body: JSON.stringify(game) })
     .then((response) => {
       if (!response.ok) {
@@ -76,11 +103,11 @@ function playMove(srcHex, dstHex) {
       return response.json();
     })
     .then((data) => {
-      let game = JSON.parse(data);
-      state.grid = game.state.grid;
-      state.rings = game.state.rings;
-      state.rows = game.state.rows;
-      state.over = game.state.over;
+      state.grid = data.state.grid;
+      state.rings = data.state.rings;
+      state.rows = data.state.rows;
+      state.over = data.state.over;
+      state.dsts = data.state.dsts;
       canvas.removeEventListener("click", handleDstClick);
       endTurn();
     })
@@ -91,31 +118,18 @@ function playMove(srcHex, dstHex) {
 
 function getValidDst(hex) {
   playHex.src = hex;
-  let game = { action: hex, state: state };
-  // Check if hex contains player's ring and only fetch if it is
-  let hexContent =
-    state.grid[invGridIndex.findIndex((h) => h.q == hex.q && h.r == hex.r)];
+  // Destinations of every ring come with the state, so no request is needed
+  let index = cellIndex(hex);
+  let hexContent = state.grid[index];
+  let dsts = state.dsts[index];
   if (
-    (state.color == "w" && hexContent == 1) ||
-    (state.color == "b" && hexContent == 2)
+    dsts &&
+    ((state.color == "w" && hexContent == 1) ||
+      (state.color == "b" && hexContent == 2))
   ) {
-    fetch("/play-src", { method: "POST", body: JSON.stringify(game) })
-      .then((response) => {
-        if (!response.ok) {
-          throw new Error("Invalid response");
-        }
-        return response.json();
-      })
-      .then((data) => {
-        let dsts = JSON.parse(data);
-        validDsts = dsts.map((i) => gridIndex[parseInt(i)]);
-        validDsts.forEach((hex) => drawRing(hex, state.color == "w", 0.5));
-        canvas.addEventListener("click", handleDstClick);
-      })
-      .catch((error) => {
-        console.error("Invalid source hex", error);
-        canvas.addEventListener("click", handleClick);
-      });
+    validDsts = dsts.map((i) => gridIndex[parseInt(i)]);
+    validDsts.forEach((hex) => drawRing(hex, state.color == "w", 0.5));
+    canvas.addEventListener("click", handleDstClick);
   } else {
     canvas.removeEventListener("click", handleDstClick);
     canvas.addEventListener("click", handleClick);
@@ -142,22 +156,19 @@ function handleDstClick(e) {
 
 function handleRows() {
   if (state.rows) {
+    // When both players complete a row in the same turn, the player who moved
+    // removes theirs first. The other row is handled when the turn ends again.
     if (playerTurn) {
       if (state.rows[state.color].length !== 0) {
         canvas.addEventListener("mousemove", highlightRow);
         canvas.addEventListener("click", selectRow);
-      }
-      if (state.rows[state.botColor].length !== 0) {
+      } else if (state.rows[state.botColor].length !== 0) {
         botRows();
       }
     } else {
-      // Duplicate code to handle player ordering for edge cases where both
-      // players get a completed row in the same turn.
-      // Player whose turn it is has priority to select their row.
       if (state.rows[state.botColor].length !== 0) {
         botRows();
-      }
-      if (state.rows[state.color].length !== 0) {
+      } else if (state.rows[state.color].length !== 0) {
         canvas.addEventListener("mousemove", highlightRow);
         canvas.addEventListener("click", selectRow);
       }
@@ -174,7 +185,7 @@ function selectRow(e) {
       if (h.q == hex.q && h.r == hex.r) {
         fetch("/row", {
           method: "POST",
-          body: JSON.stringify({ row: hexRow, state: state }),
+          body: JSON.stringify({ id: state.id, row: row }),
         })
           .then((response) => {
             if (!response.ok) {
@@ -183,10 +194,10 @@ function selectRow(e) {
             return response.json();
           })
           .then((data) => {
-            let game = JSON.parse(data);
-            state.grid = game.state.grid;
-            state.rows = game.state.rows;
-            state.over = game.state.over;
+            state.grid = data.state.grid;
+            state.rows = data.state.rows;
+            state.over = data.state.over;
+            state.dsts = data.state.dsts;
             canvas.removeEventListener("mousemove", highlightRow);
             canvas.removeEventListener("click", selectRow);
             canvas.addEventListener("mousemove", highlightRing);
@@ -208,13 +219,12 @@ function selectRow(e) {
 function selectRing(e) {
   let pos = getPosition(e);
   let hex = pixel_to_hex(pos.x, pos.y);
-  let hexContent =
-    state.grid[invGridIndex.findIndex((h) => h.q == hex.q && h.r == hex.r)];
+  let hexContent = state.grid[cellIndex(hex)];
   if (
     (state.color == "w" && hexContent == 1) ||
     (state.color == "b" && hexContent == 2)
   ) {
-    let game = { action: hex, state: state };
+    let game = { id: state.id, action: cellIndex(hex) };
     fetch("/ring", { method: "POST", body: JSON.stringify(game) })
       .then((response) => {
         if (!response.ok) {
@@ -223,11 +233,11 @@ function selectRing(e) {
         return response.json();
       })
       .then((data) => {
-        let game = JSON.parse(data);
-        state.grid = game.state.grid;
-        state.rings = game.state.rings;
-        state.rows = game.state.rows;
-        state.over = game.state.over;
+        state.grid = data.state.grid;
+        state.rings = data.state.rings;
+        state.rows = data.state.rows;
+        state.over = data.state.over;
+        state.dsts = data.state.dsts;
         canvas.removeEventListener("mousemove", highlightRing);
         canvas.removeEventListener("click", selectRing);
         endTurn();
@@ -256,8 +266,7 @@ function highlightRing(e) {
   updateBoard();
   let pos = getPosition(e);
   let hex = pixel_to_hex(pos.x, pos.y);
-  let hexContent =
-    state.grid[invGridIndex.findIndex((h) => h.q == hex.q && h.r == hex.r)];
+  let hexContent = state.grid[cellIndex(hex)];
   if (
     (state.color == "w" && hexContent == 1) ||
     (state.color == "b" && hexContent == 2)
@@ -307,7 +316,7 @@ function updateBoard() {
 }
 
 function botTurn() {
-  fetch("/bot", { method: "POST", body: JSON.stringify({ state: state }) })
+  fetch("/bot", { method: "POST", body: JSON.stringify({ id: state.id }) })
     .then((response) => {
       if (!response.ok) {
         throw new Error("Invalid response");
@@ -315,12 +324,12 @@ function botTurn() {
       return response.json();
     })
     .then((data) => {
-      let game = JSON.parse(data);
-      state.grid = game.state.grid;
-      state.rings = game.state.rings;
-      state.rows = game.state.rows;
-      state.over = game.state.over;
-      state.requiresSetup = game.state.requiresSetup;
+      state.grid = data.state.grid;
+      state.rings = data.state.rings;
+      state.rows = data.state.rows;
+      state.over = data.state.over;
+      state.dsts = data.state.dsts;
+      state.requiresSetup = data.state.requiresSetup;
       canvas.addEventListener("click", handleClick);
       endTurn();
     })
@@ -330,7 +339,7 @@ function botTurn() {
 }
 
 function botRows() {
-  fetch("/bot-row", { method: "POST", body: JSON.stringify({ state: state }) })
+  fetch("/bot-row", { method: "POST", body: JSON.stringify({ id: state.id }) })
     .then((response) => {
       if (!response.ok) {
         throw new Error("Invalid response");
@@ -338,11 +347,11 @@ function botRows() {
       return response.json();
     })
     .then((data) => {
-      let game = JSON.parse(data);
-      state.grid = game.state.grid;
-      state.rings = game.state.rings;
-      state.rows = game.state.rows;
-      state.over = game.state.over;
+      state.grid = data.state.grid;
+      state.rings = data.state.rings;
+      state.rows = data.state.rows;
+      state.over = data.state.over;
+      state.dsts = data.state.dsts;
       endTurn();
     })
     .catch((error) => {
@@ -351,15 +360,14 @@ function botRows() {
 }
 
 function getOutcome() {
-  fetch("/outcome", { method: "POST", body: JSON.stringify({ state: state }) })
+  fetch("/outcome", { method: "POST", body: JSON.stringify({ id: state.id }) })
     .then((response) => {
       if (!response.ok) {
         throw new Error("Invalid response");
       }
       return response.json();
     })
-    .then((data) => {
-      let outcome = JSON.parse(data);
+    .then((outcome) => {
       if (outcome == "DRAW") {
         gameEnd("Draw");
       } else if (outcome == (state.color == "w")) {
@@ -29,11 +29,13 @@ function gameEnd(winner) {
   };
   // Resets state for rematches
   state = {
+    id: null,
     grid: {},
     color: color,
     variant: variant,
     rings: { white: 0, black: 0 },
     requiresSetup: true,
     rows: { w: [], b: [] },
+    dsts: {},
   };
 }
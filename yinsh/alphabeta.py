@@ -0,0 +1,258 @@
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass
+from typing import Callable
+
+from yinsh.game import GameState, Move
+from yinsh.helpers import popcount
+from yinsh.transposition import Bound, TranspositionTable
+from yinsh.types import Player
+
+# Score of a won position, less the number of plies to reach it so faster wins score higher
+WIN_SCORE = 1_000_000
+_WIN_THRESHOLD = WIN_SCORE - 10_000
+
+
+def material(game: GameState, player: Player):
+    """Scores rings removed, then markers on the board, for player against their opponent"""
+    board = game.board
+    rings = game.players[player].rings - game.players[player.other].rings
+    markers = popcount(board._marker_masks[player.value]) - popcount(
+        board._marker_masks[player.other.value]
+    )
+    return 1000 * rings + markers
+
+
+def _to_table(score: float, ply: int):
+    """Converts a win or loss score from distance to the root to distance to this node"""
+    if score >= _WIN_THRESHOLD:
+        return score + ply
+    if score <= -_WIN_THRESHOLD:
+        return score - ply
+    return score
+
+
+def _from_table(score: float, ply: int):
+    """Undoes _to_table for a node found at ply"""
+    if score >= _WIN_THRESHOLD:
+        return score - ply
+    if score <= -_WIN_THRESHOLD:
+        return score + ply
+    return score
+
+
+@dataclass
+class AlphaBetaResult:
+    move: Move
+    score: float  # From the point of view of the player to move
+    depth: int  # Deepest fully completed iteration
+    nodes: int
+    elapsed: float
+    pv: list[Move]
+
+
+class _Stop(Exception):
+    ...
+
+
+class AlphaBeta:
+    def __init__(
+        self,
+        evaluate: Callable[[GameState, Player], float] = material,
+        table: TranspositionTable = None,
+        aspiration: float = 50,
+    ):
+        """
+        Negamax alpha-beta search with iterative deepening\n
+        evaluate scores a position for the given player. Moves are ordered by the
+        transposition table move, then killer moves, then the history heuristic.
+        Each iteration starts with an aspiration window of the given width around the
+        previous score. Row and ring removals belong to the turn of the player who makes
+        them, so they don't use up depth
+        """
+        self.evaluate = evaluate
+        self.table = table if table is not None else TranspositionTable(size_mb=16)
+        self.aspiration = aspiration
+
+        self.nodes = 0
+        self._root_move: Move | None = None
+        # Killer moves by ply and history scores, kept for ring moves only and keyed by move id
+        self._killers: list[list[int]] = []
+        self._history: dict[int, int] = {}
+        self._deadline = math.inf
+        self._max_nodes = math.inf
+
+    def search(
+        self,
+        game: GameState,
+        depth: int = None,
+        time_limit: float = None,
+        max_nodes: int = None,
+    ):
+        """
+        Searches from the given game, which is left unchanged\n
+        Deepens one ply at a time until depth is reached, or stops cleanly when the time
+        limit in seconds or the node budget runs out, returning the deepest completed result
+        """
+        if depth is None and time_limit is None and max_nodes is None:
+            raise ValueError("Search requires a depth, time or node limit")
+
+        state = game.copy()
+        moves = list(state.legal_moves)
+        if not moves or state.is_over():
+            raise ValueError("Game is over")
+
+        start = time.perf_counter()
+        self._deadline = start + time_limit if time_limit is not None else math.inf
+        self._max_nodes = max_nodes if max_nodes is not None else math.inf
+        self.nodes = 0
+        self._killers = []
+        self._history = {}
+        self.table.new_search()
+
+        result = AlphaBetaResult(moves[0], 0, 0, 0, 0.0, [moves[0]])
+        score = 0
+        current = 1
+        while depth is None or current <= depth:
+            try:
+                score = self._aspiration_search(state, current, score)
+            except _Stop:
+                break
+            pv = self._principal_variation(state, current)
+            if not pv or pv[0] != self._root_move:
+                pv = [self._root_move]
+            result = AlphaBetaResult(self._root_move, score, current, self.nodes, 0.0, pv)
+            if abs(score) >= _WIN_THRESHOLD:
+                break  # A forced result has been found
+            current += 1
+
+        result.nodes = self.nodes
+        result.elapsed = time.perf_counter() - start
+        return result
+
+    def _aspiration_search(self, game: GameState, depth: int, guess: float):
+        if depth > 1:
+            alpha, beta = guess - self.aspiration, guess + self.aspiration
+            score = self._negamax(game, depth, alpha, beta, 0)
+            if alpha < score < beta:
+                return score
+        return self._negamax(game, depth, -math.inf, math.inf, 0)
+
+    def _negamax(self, game: GameState, depth: int, alpha: float, beta: float, ply: int):
+        self.nodes += 1
+        if self.nodes >= self._max_nodes or (
+            self.nodes & 63 == 0 and time.perf_counter() >= self._deadline
+        ):
+            raise _Stop
+
+        player = game.active_player
+        moves = list(game.legal_moves)
+        if not moves:
+            return self._final_score(game, player, ply)
+        if depth <= 0 and not moves[0].is_removal:
+            return self.evaluate(game, player)
+
+        alpha_original = alpha
+        key = game.hash
+        entry = self.table.probe(key)
+        table_move = None
+        if entry is not None:
+            if 0 <= entry.move < len(moves):
+                table_move = moves[entry.move]
+            if entry.depth >= depth and ply > 0:
+                # Win scores are stored relative to the node, as it may be reached at any ply
+                value = _from_table(entry.value, ply)
+                if entry.bound == Bound.EXACT:
+                    return value
+                elif entry.bound == Bound.LOWER:
+                    alpha = max(alpha, value)
+                elif entry.bound == Bound.UPPER:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        best_score = -math.inf
+        best_index = -1
+        for index, move in self._ordered(game, moves, table_move, ply):
+            game.push(move)
+            # Removals continue the turn, so they use no depth and may keep the same player
+            child_depth = depth if move.is_removal else depth - 1
+            if game.active_player == player:
+                score = self._negamax(game, child_depth, alpha, beta, ply + 1)
+            else:
+                score = -self._negamax(game, child_depth, -beta, -alpha, ply + 1)
+            game.pop()
+
+            if score > best_score:
+                best_score = score
+                best_index = index
+                if ply == 0:
+                    self._root_move = move
+            alpha = max(alpha, score)
+            if alpha >= beta:
+                if move.is_play:
+                    move_id = move.id
+                    self._store_killer(move_id, ply)
+                    self._history[move_id] = self._history.get(move_id, 0) + depth * depth
+                break
+
+        if best_score <= alpha_original:
+            bound = Bound.UPPER
+        elif best_score >= beta:
+            bound = Bound.LOWER
+        else:
+            bound = Bound.EXACT
+        self.table.store(key, _to_table(best_score, ply), depth, bound, best_index)
+        return best_score
+
+    def _ordered(self, game: GameState, moves: list[Move], table_move: Move | None, ply: int):
+        """Pairs each move with its generation index, best candidates first"""
+        if not moves[0].is_play:
+            # A node's moves are all of one kind, and only ring moves have killers and history
+            return sorted(enumerate(moves), key=lambda item: item[1] != table_move)
+
+        killers = self._killers[ply] if ply < len(self._killers) else []
+        history = self._history
+        ids = list(game.legal_moves.ids())
+
+        def priority(index: int):
+            if moves[index] == table_move:
+                return (0, 0)
+            move_id = ids[index]
+            if move_id in killers:
+                return (1, killers.index(move_id))
+            return (2, -history.get(move_id, 0))
+
+        return [(index, moves[index]) for index in sorted(range(len(moves)), key=priority)]
+
+    def _store_killer(self, move_id: int, ply: int):
+        while len(self._killers) <= ply:
+            self._killers.append([])
+        killers = self._killers[ply]
+        if move_id not in killers:
+            killers.insert(0, move_id)
+            del killers[2:]
+
+    def _final_score(self, game: GameState, player: Player, ply: int):
+        rings = game.players[player].rings - game.players[player.other].rings
+        if rings > 0:
+            return WIN_SCORE - ply
+        elif rings < 0:
+            return -WIN_SCORE + ply
+        return 0
+
+    def _principal_variation(self, game: GameState, depth: int):
+        """Follows the best moves stored in the transposition table from the root"""
+        pv = []
+        for _ in range(depth):
+            entry = self.table.probe(game.hash)
+            moves = list(game.legal_moves)
+            if entry is None or not 0 <= entry.move < len(moves):
+                break
+            pv.append(moves[entry.move])
+            game.push(moves[entry.move])
+        for _ in pv:
+            game.pop()
+        return pv
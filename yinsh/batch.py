@@ -0,0 +1,206 @@
+from __future__ import annotations
+
+from dataclasses import dataclass
+
+import numpy as np
+
+from yinsh.game import GameState
+from yinsh.helpers import iter_bits, num_cells, rays, windows
+
+# Cell contents, matching the codes used by GameState.parse_state
+EMPTY, WHITE_RING, BLACK_RING, WHITE_MARKER, BLACK_MARKER = range(5)
+# Content of the extra cell past the end of each row, used to pad rays and ring lists
+WALL = 5
+
+_WALL_CELL = num_cells
+_RING_SLOTS = 5
+_MAX_RAY = max(len(ray) for cell_rays in rays for ray in cell_rays)
+_DIRECTIONS = len(rays[0])
+
+# Rays from every cell, padded with the wall cell, which also has rays of only the wall cell
+_RAYS = np.full((num_cells + 1, _DIRECTIONS, _MAX_RAY), _WALL_CELL, dtype=np.intp)
+for index, cell_rays in enumerate(rays):
+    for direction, ray in enumerate(cell_rays):
+        _RAYS[index, direction, : len(ray)] = ray
+
+_WINDOWS = np.array(windows, dtype=np.intp)
+
+
+@dataclass
+class BatchResult:
+    outcomes: np.ndarray  # 1 for a white win, -1 for a black win, 0 for a draw or unfinished
+    lengths: np.ndarray  # Moves made in each game, counting placements and removals
+    finished: np.ndarray  # False for games stopped by the move limit
+
+
+def encode(game: GameState):
+    """Returns the cell contents of the game's board as an array indexed by coordinate index"""
+    cells = np.zeros(num_cells, dtype=np.int8)
+    board = game.board
+    for code, mask in [
+        (WHITE_RING, board._ring_masks[1]),
+        (BLACK_RING, board._ring_masks[0]),
+        (WHITE_MARKER, board._marker_masks[1]),
+        (BLACK_MARKER, board._marker_masks[0]),
+    ]:
+        cells[list(iter_bits(mask))] = code
+    return cells
+
+
+def legal_slides(cells: np.ndarray, white: np.ndarray):
+    """
+    Finds the legal ring moves of the side to move in each game\n
+    cells has one row per game, including the wall cell, and white is True where white
+    is to move. Returns the source cell of each of up to 5 rings, padded with the wall cell,
+    and a mask of shape (games, rings, directions, steps) of the legal destinations
+    along each ray from those rings
+    """
+    ring = np.where(white, WHITE_RING, BLACK_RING).astype(np.int8)
+    is_ring = cells[:, :num_cells] == ring[:, None]
+    order = np.argsort(~is_ring, axis=1, kind="stable")[:, :_RING_SLOTS]
+    count = is_ring.sum(axis=1)
+    sources = np.where(np.arange(_RING_SLOTS) < count[:, None], order, _WALL_CELL)
+
+    content = cells[np.arange(len(cells))[:, None, None, None], _RAYS[sources]]
+    is_empty = content == EMPTY
+    is_marker = (content == WHITE_MARKER) | (content == BLACK_MARKER)
+    is_blocking = ~is_empty & ~is_marker
+
+    # A ring stops at any ring or the edge, and at the first vacant cell after a marker
+    after_marker = is_empty & _before(is_marker)
+    legal = is_empty & ~_before(is_blocking) & ~_before(after_marker)
+    return sources, legal
+
+
+def _before(mask: np.ndarray):
+    """True at each step of a ray where the mask is set at any earlier step"""
+    seen = np.logical_or.accumulate(mask, axis=-1)
+    return np.concatenate([np.zeros_like(seen[..., :1]), seen[..., :-1]], axis=-1)
+
+
+def _random_true(mask: np.ndarray, rng: np.random.Generator):
+    """Picks the index of a random True entry in each row of a 2D mask"""
+    scores = rng.random(mask.shape)
+    scores[~mask] = -1
+    return scores.argmax(axis=1)
+
+
+class _Batch:
+    def __init__(self, game: GameState, games: int, rng: np.random.Generator):
+        self.rng = rng
+        self.rings_to_win = game._rings_to_win
+
+        self.cells = np.full((games, num_cells + 1), WALL, dtype=np.int8)
+        self.cells[:, :num_cells] = encode(game)
+        self.white = np.full(games, game.next_player.value)
+        self.setup = np.full(games, game.requires_setup)
+        # Rings removed, indexed by Player.value
+        self.removed = np.tile([game.players.black.rings, game.players.white.rings], (games, 1))
+
+        self.outcomes = np.zeros(games, dtype=np.int8)
+        self.lengths = np.zeros(games, dtype=np.int32)
+        self.done = np.zeros(games, dtype=bool)
+
+        over = self.removed.max(axis=1) >= self.rings_to_win
+        self._finish(np.flatnonzero(over))
+
+    def step(self):
+        """Makes the pending removals and then one placement or ring move in every live game"""
+        active = np.flatnonzero(~self.done & ~self.setup)
+        # The player who moved last removes their rows first
+        self._remove_rows(active, ~self.white[active])
+        active = active[~self.done[active]]
+        self._remove_rows(active, self.white[active])
+
+        active = np.flatnonzero(~self.done)
+        self._place(active[self.setup[active]])
+        self._play(active[~self.setup[active]])
+
+    def _finish(self, games: np.ndarray):
+        """Ends games, with the player who removed more rings as the winner"""
+        self.done[games] = True
+        self.outcomes[games] = np.sign(self.removed[games, 1] - self.removed[games, 0])
+
+    def _remove_rows(self, games: np.ndarray, white: np.ndarray):
+        while games.size:
+            marker = np.where(white, WHITE_MARKER, BLACK_MARKER).astype(np.int8)
+            rows = (self.cells[games][:, _WINDOWS] == marker[:, None, None]).all(axis=-1)
+            has_row = rows.any(axis=1)
+            games, white, rows = games[has_row], white[has_row], rows[has_row]
+            if not games.size:
+                return
+
+            row = _random_true(rows, self.rng)
+            self.cells[games[:, None], _WINDOWS[row]] = EMPTY
+
+            ring = np.where(white, WHITE_RING, BLACK_RING).astype(np.int8)
+            ring = _random_true(self.cells[games, :num_cells] == ring[:, None], self.rng)
+            self.cells[games, ring] = EMPTY
+
+            player = white.astype(np.intp)
+            self.removed[games, player] += 1
+            self.lengths[games] += 1
+
+            won = self.removed[games, player] >= self.rings_to_win
+            self._finish(games[won])
+            games, white = games[~won], white[~won]
+
+    def _place(self, games: np.ndarray):
+        if not games.size:
+            return
+        cell = _random_true(self.cells[games, :num_cells] == EMPTY, self.rng)
+        self.cells[games, cell] = np.where(self.white[games], WHITE_RING, BLACK_RING)
+        self.white[games] = ~self.white[games]
+        self.lengths[games] += 1
+
+        rings = self.cells[games, :num_cells]
+        placed = ((rings == WHITE_RING) | (rings == BLACK_RING)).sum(axis=1)
+        self.setup[games[placed == 2 * _RING_SLOTS]] = False
+
+    def _play(self, games: np.ndarray):
+        if not games.size:
+            return
+        white = self.white[games]
+        sources, legal = legal_slides(self.cells[games], white)
+        legal = legal.reshape(len(games), -1)
+
+        stuck = ~legal.any(axis=1)
+        self._finish(games[stuck])
+        games, white, sources, legal = games[~stuck], white[~stuck], sources[~stuck], legal[~stuck]
+        if not games.size:
+            return
+
+        choice = _random_true(legal, self.rng)
+        slot, direction, step = np.unravel_index(choice, (_RING_SLOTS, _DIRECTIONS, _MAX_RAY))
+        src = sources[np.arange(len(games)), slot]
+        path = _RAYS[src, direction]
+        dst = path[np.arange(len(games)), step]
+
+        # Flip every marker passed over
+        contents = self.cells[games[:, None], path]
+        passed = np.arange(_MAX_RAY) < step[:, None]
+        flip = passed & ((contents == WHITE_MARKER) | (contents == BLACK_MARKER))
+        self.cells[games[:, None], path] = np.where(
+            flip, WHITE_MARKER + BLACK_MARKER - contents, contents
+        )
+
+        self.cells[games, src] = np.where(white, WHITE_MARKER, BLACK_MARKER)
+        self.cells[games, dst] = np.where(white, WHITE_RING, BLACK_RING)
+        self.white[games] = ~white
+        self.lengths[games] += 1
+
+
+def simulate(game: GameState = None, games: int = 1000, max_moves: int = 1000, seed: int = None):
+    """
+    Plays a batch of random games to the end at once, from the given game or a new one\n
+    Every step advances all unfinished games together using array operations.
+    Moves, removals and results follow the rules of GameState, with each legal move
+    equally likely. Games still running after max_moves steps are marked unfinished
+    """
+    game = game if game is not None else GameState.new_game()
+    batch = _Batch(game, games, np.random.default_rng(seed))
+    for _ in range(max_moves):
+        if batch.done.all():
+            break
+        batch.step()
+    return BatchResult(batch.outcomes, batch.lengths, batch.done)
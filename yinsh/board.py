@@ -1,155 +1,498 @@
 from __future__ import annotations
 
-from yinsh.helpers import inv_coordinate_index, straight_line, valid_hexes
-from yinsh.types import Direction, Hex, IllegalMoveError, Marker, Player, Ring
+from collections.abc import MutableMapping
+from typing import Iterator
+
+from yinsh.helpers import (
+    between_masks,
+    board_mask,
+    cell_windows,
+    coordinate_index,
+    inv_coordinate_index,
+    iter_bits,
+    line_between,
+    line_masks,
+    num_cells,
+    popcount,
+    ray_destinations,
+    ray_direction,
+    rays,
+    symmetries,
+    transform_mask,
+    window_masks,
+    windows,
+)
+from yinsh.types import Hex, IllegalMoveError, Marker, Player, Ring
+from yinsh.zobrist import flip_keys, marker_keys, ring_keys
+
+# Ray counts of a cell without a ring
+_no_rays = [0] * 6
 
 
 class Board:
     def __init__(self):
-        self._grid: dict[Hex, Ring | Marker | None] = {}
-        self.rings: dict[Hex, Ring] = {}
-        self.markers: dict[Hex, Marker] = {}
+        # Bitboards indexed by Player.value (0 for black, 1 for white),
+        # where bit i is set if the cell inv_coordinate_index[i] holds the piece
+        self._ring_masks = [0, 0]
+        self._marker_masks = [0, 0]
+
+        # Zobrist key of the board contents, kept up to date by every change to the masks
+        self.hash = 0
+
+        # Bitmasks over helpers.windows of the five-cell windows filled by each colour,
+        # rechecked only for the windows holding a marker that changed
+        self._rows = [0, 0]
+
+        # Markers in each window holding only one colour of marker, positive for white and
+        # negative for black, and the number of windows by marker count, indexed by
+        # Player.value then count. Rechecked along with _rows
+        self._window_counts = [0] * len(windows)
+        self._lines = [[0] * 6, [0] * 6]
+
+        # Destinations of each player's rings along each of their rays, indexed by
+        # Player.value then cell * 6 + direction, with their totals, and a bitboard for each
+        # player of the cells emptied or filled since their rings were last counted
+        self._ray_counts = [[0] * (6 * num_cells), [0] * (6 * num_cells)]
+        self._mobility = [0, 0]
+        self._changed = [0, 0]
+
+        # Pieces written through the dict views to hexes that aren't on the board
+        self._off_board: dict[Hex, Ring | Marker] = {}
+
+    @property
+    def _grid(self):
+        return BoardView(self)
+
+    @_grid.setter
+    def _grid(self, contents: dict[Hex, Ring | Marker | None]):
+        self._replace(BoardView(self), contents)
+
+    @property
+    def rings(self):
+        return BoardView(self, Ring)
+
+    @rings.setter
+    def rings(self, contents: dict[Hex, Ring]):
+        self._replace(BoardView(self, Ring), contents)
+
+    @property
+    def markers(self):
+        return BoardView(self, Marker)
+
+    @markers.setter
+    def markers(self, contents: dict[Hex, Marker]):
+        self._replace(BoardView(self, Marker), contents)
+
+    @property
+    def occupied(self):
+        """Bitboard of every cell holding a ring or a marker"""
+        return (
+            self._ring_masks[0]
+            | self._ring_masks[1]
+            | self._marker_masks[0]
+            | self._marker_masks[1]
+        )
 
     def place_ring(self, player: Player, hex: Hex):
         """Place a ring during setup of starting position"""
-        if hex not in valid_hexes:
+        index = coordinate_index.get(hex)
+        if index is None:
             raise IllegalMoveError(f"Hex must be valid board location: {hex}")
 
-        if self._grid.get(hex) is not None:
+        if self.occupied >> index & 1:
             raise IllegalMoveError(f"Hex is not empty: {hex}")
 
-        self._grid[hex] = Ring.WHITE if player.value else Ring.BLACK
-        self.rings[hex] = Ring.WHITE if player.value else Ring.BLACK
-
-        white_rings, black_rings = self._get_ring_count()
-        if white_rings > 5 or black_rings > 5:
-            del self._grid[hex]
+        if popcount(self._ring_masks[player.value]) >= 5:
             raise IllegalMoveError("Board would have too many rings")
 
+        self._ring_masks[player.value] |= 1 << index
+        self.hash ^= ring_keys[player.value][index]
+        self._changed[0] |= 1 << index
+        self._changed[1] |= 1 << index
+
     def is_valid_move(self, src_hex: Hex, dst_hex: Hex, silent: bool = True):
         """
         Determines if a move would be valid for the current board state\n
         If silent is False, exceptions will be raised instead of returning
         """
-        if self.rings.get(src_hex) is None:
+        src = coordinate_index.get(src_hex)
+        dst = coordinate_index.get(dst_hex)
+        rings = self._ring_masks[0] | self._ring_masks[1]
+        markers = self._marker_masks[0] | self._marker_masks[1]
+
+        if src is None:
+            has_ring = isinstance(self._off_board.get(src_hex), Ring)
+        else:
+            has_ring = rings >> src & 1
+        if not has_ring:
             if silent:
                 return False
             raise IllegalMoveError(f"Source hex must contain ring: {src_hex}")
 
         # Hexes must be valid locations
-        if not {src_hex, dst_hex} <= valid_hexes:
+        if src is None or dst is None:
             if silent:
                 return False
             raise IllegalMoveError(f"Hexes must be valid board locations: {src_hex}, {dst_hex}")
 
         # A ring must move
-        if src_hex == dst_hex:
+        if src == dst:
             if silent:
                 return False
             raise IllegalMoveError("Ring must move to a new space")
 
         # A ring must always move to a vacant space
-        if self._grid.get(dst_hex) is not None:
+        if (rings | markers) >> dst & 1:
             if silent:
                 return False
             raise IllegalMoveError(f"Destination hex is not empty: {dst_hex}")
 
         # A ring must always move in a straight line
-        path = straight_line(src_hex, dst_hex)
-        if path is None:
+        line = line_between(src, dst)
+        if line is None:
             if silent:
                 return False
             raise IllegalMoveError("Ring must move in a straight line")
 
-        for i, hex in enumerate(path[1:-1], start=2):
-            hex_content = self._grid.get(hex)
+        passed_marker = False
+        for index in line[1]:
+            bit = 1 << index
 
             # A ring can only jump over markers, not over rings
-            if isinstance(hex_content, Ring):
+            if rings & bit:
                 if silent:
                     return False
-                raise IllegalMoveError(f"Ring cannot pass another ring: {hex_content} at {hex}")
+                hex = inv_coordinate_index[index]
+                raise IllegalMoveError(f"Ring cannot pass another ring: {self._cell(bit)} at {hex}")
+
+            if markers & bit:
+                passed_marker = True
 
             # A ring must land in the first vacant space after passing one or more markers
-            elif isinstance(hex_content, Marker) and i < len(path) - 1:
-                if self._grid.get(path[i]) is None:
-                    if silent:
-                        return False
-                    raise IllegalMoveError(
-                        f"Ring cannot pass vacant spaces after passing markers: {hex}"
-                    )
+            elif passed_marker:
+                if silent:
+                    return False
+                hex = inv_coordinate_index[index]
+                raise IllegalMoveError(
+                    f"Ring cannot pass vacant spaces after passing markers: {hex}"
+                )
 
         return True
 
     def move_ring(self, player: Player, src_hex: Hex, dst_hex: Hex):
         """Move a ring from source to destination"""
         assert self.is_valid_move(src_hex, dst_hex, silent=False)
-        if self.rings[src_hex].value != player.value:
+        src = coordinate_index[src_hex]
+        dst = coordinate_index[dst_hex]
+        if not self._ring_masks[player.value] >> src & 1:
             raise IllegalMoveError(f"Can't move opponent's ring: {src_hex}")
 
-        self._grid[src_hex] = Marker.WHITE if player.value else Marker.BLACK
-        self._grid[dst_hex] = Ring.WHITE if player.value else Ring.BLACK
-        del self.rings[src_hex]
-        self.rings[dst_hex] = Ring.WHITE if player.value else Ring.BLACK
-        self.markers[src_hex] = Marker.WHITE if player.value else Marker.BLACK
+        self._ring_masks[player.value] ^= 1 << src | 1 << dst
+        self._marker_masks[player.value] |= 1 << src
 
-        path = straight_line(src_hex, dst_hex)
-        for hex in path[1:-1]:  # Slice to skip src and dst hexes
-            hex_content = self._grid.get(hex)
-            if hex in self.markers:
-                self._grid[hex] = hex_content.other
-                self.markers[hex] = hex_content.other
+        # Every marker passed over changes colour, so it toggles in both masks
+        flipped = between_masks[src * num_cells + dst] & (
+            self._marker_masks[0] | self._marker_masks[1]
+        )
+        self._marker_masks[0] ^= flipped
+        self._marker_masks[1] ^= flipped
+        self.hash ^= self._move_key(player, src, dst, flipped)
+        self._update_rows(src, flipped)
+        # Flipping markers leaves every cell as full as it was, so only src and dst changed
+        self._changed[0] |= 1 << src | 1 << dst
+        self._changed[1] |= 1 << src | 1 << dst
+
+    def copy(self):
+        """Returns an independent copy of the board"""
+        board = Board()
+        board._ring_masks = self._ring_masks.copy()
+        board._marker_masks = self._marker_masks.copy()
+        board._off_board = self._off_board.copy()
+        board.hash = self.hash
+        board._rows = self._rows.copy()
+        board._window_counts = self._window_counts.copy()
+        board._lines = [self._lines[0].copy(), self._lines[1].copy()]
+        board._ray_counts = [self._ray_counts[0].copy(), self._ray_counts[1].copy()]
+        board._mobility = self._mobility.copy()
+        board._changed = self._changed.copy()
+        return board
+
+    def transform(self, symmetry: int):
+        """
+        Returns a copy of the board mapped through helpers.symmetries[symmetry]\n
+        Pieces on hexes off the board are left out
+        """
+        board = Board()
+        board._ring_masks = [transform_mask(mask, symmetry) for mask in self._ring_masks]
+        board._marker_masks = [transform_mask(mask, symmetry) for mask in self._marker_masks]
+        board.hash = self.symmetric_hash(symmetry)
+        board._update_rows(0, board._marker_masks[0] | board._marker_masks[1])
+        board._changed = [board_mask, board_mask]
+        return board
+
+    def symmetric_hash(self, symmetry: int):
+        """Zobrist key the board would have once mapped through helpers.symmetries[symmetry]"""
+        permutation = symmetries[symmetry]
+        key = 0
+        for keys, mask in (
+            (ring_keys[0], self._ring_masks[0]),
+            (ring_keys[1], self._ring_masks[1]),
+            (marker_keys[0], self._marker_masks[0]),
+            (marker_keys[1], self._marker_masks[1]),
+        ):
+            for index in iter_bits(mask):
+                key ^= keys[permutation[index]]
+        return key
+
+    def partial_lines(self, player: Player):
+        """
+        Counts the windows holding markers of player and none of their opponent,
+        indexed by the number of markers from 1 to 5. Index 0 is always 0
+        """
+        return self._lines[player.value]
+
+    def mobility(self, player: Player):
+        """
+        Counts the destinations of player's rings\n
+        The count along each ray is kept, and only rays through a cell that changed
+        since player's rings were last counted are walked again
+        """
+        changed = self._changed[player.value]
+        if changed:
+            counts = self._ray_counts[player.value]
+            own = self._ring_masks[player.value]
+            rings = self._ring_masks[0] | self._ring_masks[1]
+            markers = self._marker_masks[0] | self._marker_masks[1]
+            total = self._mobility[player.value]
+            stale = set()
+            for cell in iter_bits(changed):
+                base = 6 * cell
+                if own >> cell & 1:
+                    stale.update(range(base, base + 6))
+                else:
+                    # Any ring of player's that was here has gone
+                    total -= sum(counts[base : base + 6])
+                    counts[base : base + 6] = _no_rays
+                # Rings on a line with the cell, along the ray from each ring that passes it
+                for ring in iter_bits(line_masks[cell] & own):
+                    stale.add(6 * ring + ray_direction[ring * num_cells + cell])
+            for key in stale:
+                ray = rays[key // 6][key % 6]
+                count = len(list(ray_destinations(ray, rings, markers)))
+                total += count - counts[key]
+                counts[key] = count
+            self._mobility[player.value] = total
+            self._changed[player.value] = 0
+        return self._mobility[player.value]
 
     def get_rows(self, player: Player):
         """Returns a list of completed rows on the board"""
-        rows: list[list[Hex]] = []
-        for hex, marker in self.markers.items():
-            if marker.value != player.value:
-                continue
-            # Only 3 directions to prevent duplicate rows
-            for direction in [Direction.N, Direction.NE, Direction.SE]:
-                dir_hex = hex + direction.value.scale(4)
-                if dir_hex in valid_hexes:
-                    dir_marker = self.markers.get(dir_hex)
-                    if dir_marker is None:
-                        continue
-                    elif dir_marker.value != marker.value:
-                        continue
-
-                    possible_row = straight_line(hex, dir_hex)
-                    valid = True
-                    for row_hex in possible_row[1:-1]:
-                        row_marker = self.markers.get(row_hex)
-                        if row_marker is None:
-                            valid = False
-                            break
-                        elif row_marker.value != marker.value:
-                            valid = False
-                            break
-                    if valid:
-                        rows.append(possible_row)
-        return rows
+        return [
+            [inv_coordinate_index[index] for index in windows[window]]
+            for window in iter_bits(self._rows[player.value])
+        ]
 
-    def _get_ring_count(self):
-        white_rings = 0
-        black_rings = 0
-        for _, ring in self.rings.items():
-            if ring.value:
-                white_rings += 1
+    def _update_rows(self, index: int, changed: int = 0):
+        """Rechecks the windows holding the cell at index or any cell in the changed bitboard"""
+        affected = cell_windows[index]
+        for changed_index in iter_bits(changed):
+            affected |= cell_windows[changed_index]
+
+        black, white = self._marker_masks
+        counts = self._window_counts
+        black_lines, white_lines = self._lines
+        black_rows = white_rows = 0
+        for window in iter_bits(affected):
+            mask = window_masks[window]
+            white_count = popcount(white & mask)
+            if not black & mask:
+                count = white_count
             else:
-                black_rings += 1
+                count = 0 if white_count else -popcount(black & mask)
+            previous = counts[window]
+            if count != previous:
+                if previous > 0:
+                    white_lines[previous] -= 1
+                elif previous:
+                    black_lines[-previous] -= 1
+                if count > 0:
+                    white_lines[count] += 1
+                elif count:
+                    black_lines[-count] += 1
+                counts[window] = count
+            if count == 5:
+                white_rows |= 1 << window
+            elif count == -5:
+                black_rows |= 1 << window
+        self._rows[0] = self._rows[0] & ~affected | black_rows
+        self._rows[1] = self._rows[1] & ~affected | white_rows
+
+    def _get_ring_count(self):
+        white_rings = popcount(self._ring_masks[Player.WHITE.value])
+        black_rings = popcount(self._ring_masks[Player.BLACK.value])
+        for ring in self._off_board.values():
+            if isinstance(ring, Ring):
+                if ring.value:
+                    white_rings += 1
+                else:
+                    black_rings += 1
         return white_rings, black_rings
 
     def _complete_row(self, row: list[Hex]):
         for hex in row:
-            del self._grid[hex]
-            del self.markers[hex]
+            if self._marker(hex) is None:
+                raise KeyError(hex)
+            self._set_content(hex, None)
 
     def _remove_ring(self, hex: Hex):
-        del self._grid[hex]
-        del self.rings[hex]
+        if self._ring(hex) is None:
+            raise KeyError(hex)
+        self._set_content(hex, None)
+
+    def _flipped_by(self, src_hex: Hex, dst_hex: Hex):
+        """Bitboard of the markers a move from source to destination would flip"""
+        between = between_masks[coordinate_index[src_hex] * num_cells + coordinate_index[dst_hex]]
+        return between & (self._marker_masks[0] | self._marker_masks[1])
+
+    def _unmove_ring(self, player: Player, src_hex: Hex, dst_hex: Hex, flipped: int):
+        """Reverses move_ring, given the bitboard of markers that it flipped"""
+        src = coordinate_index[src_hex]
+        dst = coordinate_index[dst_hex]
+        self._marker_masks[0] ^= flipped
+        self._marker_masks[1] ^= flipped
+        self._marker_masks[player.value] &= ~(1 << src)
+        self._ring_masks[player.value] ^= 1 << src | 1 << dst
+        self.hash ^= self._move_key(player, src, dst, flipped)
+        self._update_rows(src, flipped)
+        self._changed[0] |= 1 << src | 1 << dst
+        self._changed[1] |= 1 << src | 1 << dst
+
+    def _move_key(self, player: Player, src: int, dst: int, flipped: int):
+        """Zobrist key difference of moving a ring, which is the same in both directions"""
+        key = ring_keys[player.value][src] ^ ring_keys[player.value][dst]
+        key ^= marker_keys[player.value][src]
+        for index in iter_bits(flipped):
+            key ^= flip_keys[index]
+        return key
+
+    def _restore_row(self, player: Player, row: list[Hex]):
+        for hex in row:
+            self._set_content(hex, Marker(player.value))
+
+    def _restore_ring(self, player: Player, hex: Hex):
+        self._set_content(hex, Ring(player.value))
+
+    def _ring(self, hex: Hex) -> Ring | None:
+        content = self._content(hex)
+        return content if isinstance(content, Ring) else None
+
+    def _marker(self, hex: Hex) -> Marker | None:
+        content = self._content(hex)
+        return content if isinstance(content, Marker) else None
+
+    def _cell(self, bit: int) -> Ring | Marker | None:
+        """Returns the content of the cell with the given bit set"""
+        if self._ring_masks[1] & bit:
+            return Ring.WHITE
+        if self._ring_masks[0] & bit:
+            return Ring.BLACK
+        if self._marker_masks[1] & bit:
+            return Marker.WHITE
+        if self._marker_masks[0] & bit:
+            return Marker.BLACK
+        return None
+
+    def _set_cell(self, index: int, content: Ring | Marker | None):
+        """Sets the content of the cell at the given coordinate index"""
+        bit = 1 << index
+        self.hash ^= self._cell_key(index, self._cell(bit)) ^ self._cell_key(index, content)
+
+        clear = ~bit
+        self._ring_masks[0] &= clear
+        self._ring_masks[1] &= clear
+        self._marker_masks[0] &= clear
+        self._marker_masks[1] &= clear
+        if isinstance(content, Ring):
+            self._ring_masks[content.value] |= bit
+        elif isinstance(content, Marker):
+            self._marker_masks[content.value] |= bit
+        self._update_rows(index)
+        self._changed[0] |= bit
+        self._changed[1] |= bit
+
+    def _cell_key(self, index: int, content: Ring | Marker | None):
+        if isinstance(content, Ring):
+            return ring_keys[content.value][index]
+        if isinstance(content, Marker):
+            return marker_keys[content.value][index]
+        return 0
+
+    def _content(self, hex: Hex) -> Ring | Marker | None:
+        index = coordinate_index.get(hex)
+        if index is None:
+            return self._off_board.get(hex)
+        return self._cell(1 << index)
+
+    def _set_content(self, hex: Hex, content: Ring | Marker | None):
+        index = coordinate_index.get(hex)
+        if index is not None:
+            self._set_cell(index, content)
+        elif content is None:
+            self._off_board.pop(hex, None)
+        else:
+            self._off_board[hex] = content
+
+    def _contents(self) -> Iterator[tuple[Hex, Ring | Marker]]:
+        for index in iter_bits(self.occupied):
+            yield inv_coordinate_index[index], self._cell(1 << index)
+        yield from self._off_board.items()
+
+    def _replace(self, view: BoardView, contents: dict[Hex, Ring | Marker | None]):
+        view.clear()
+        view.update(contents)
 
     @classmethod
     def empty(cls):
         """Initializes a new empty YINSH board"""
         return Board()
+
+
+class BoardView(MutableMapping):
+    def __init__(self, board: Board, kind: type[Ring] | type[Marker] | None = None):
+        """
+        Dict of board contents keyed by Hex, backed by the board's bitboards\n
+        Restricted to rings or markers if kind is given, otherwise covers the whole grid
+        """
+        self._board = board
+        self._kind = kind
+
+    def _matches(self, content: Ring | Marker | None):
+        if content is None:
+            return False
+        return self._kind is None or isinstance(content, self._kind)
+
+    def __getitem__(self, hex: Hex):
+        content = self._board._content(hex)
+        if not self._matches(content):
+            raise KeyError(hex)
+        return content
+
+    def __setitem__(self, hex: Hex, content: Ring | Marker | None):
+        if content is not None and not self._matches(content):
+            raise TypeError(f"Invalid type {type(content)}")
+        self._board._set_content(hex, content)
+
+    def __delitem__(self, hex: Hex):
+        self[hex]  # Raises KeyError if hex isn't in this view
+        self._board._set_content(hex, None)
+
+    def __iter__(self):
+        for hex, content in self._board._contents():
+            if self._matches(content):
+                yield hex
+
+    def __len__(self):
+        return sum(1 for _ in self)
+
+    def __repr__(self):
+        return repr(dict(self.items()))
@@ -0,0 +1,212 @@
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from itertools import repeat
+from pathlib import Path
+from typing import Callable
+
+import numpy as np
+
+from yinsh.game import GameState, Move, decode_positions, encode_positions
+from yinsh.helpers import inv_coordinate_index, inverse_symmetries
+from yinsh.mcts import MCTS
+
+MAGIC = b"YBK2"
+
+# The book file is a HEADER followed by a hash table of slots ENTRY records.
+# key is the canonical hash of a setup position (see GameState.canonical_hash), or 0 for
+# an empty slot, move is the cell to place on in the canonical form and score is the
+# engine's evaluation for the player to move, from -1 for a loss to 1 for a win
+HEADER = np.dtype(
+    [
+        ("magic", "S4"),
+        ("blitz", "?"),
+        ("plies", "u1"),
+        ("reserved", "u2"),
+        ("slots", "<u4"),
+        ("entries", "<u4"),
+    ]
+)
+ENTRY = np.dtype([("key", "<u8"), ("move", "u1"), ("score", "<f4")])
+
+
+def _key(game: GameState):
+    """Returns the book key of a position and the symmetry mapping it onto its canonical form"""
+    key, symmetry = game.canonical_hash()
+    # 0 marks an empty slot, so it is never used as a key
+    return key or 1, symmetry
+
+
+@dataclass
+class BookEntry:
+    move: Move
+    score: float  # From the point of view of the player to move
+
+
+class OpeningBook:
+    def __init__(self, path: str | Path):
+        """
+        Ring placements read from a book file written by build_book\n
+        The file is memory-mapped, so opening it is cheap and each lookup reads
+        only the slots it probes
+        """
+        header = np.fromfile(path, dtype=HEADER, count=1)
+        if len(header) != 1 or header["magic"][0] != MAGIC:
+            raise ValueError(f"Not an opening book: {path}")
+        header = header[0]
+        self.variant = "blitz" if header["blitz"] else "standard"
+        self.plies = int(header["plies"])
+        self.slots = int(header["slots"])
+        self._mask = self.slots - 1
+        self._entries = int(header["entries"])
+
+        table = np.memmap(path, dtype=ENTRY, mode="r", offset=HEADER.itemsize, shape=self.slots)
+        self._keys = table["key"]
+        self._moves = table["move"]
+        self._scores = table["score"]
+
+    def __len__(self):
+        return self._entries
+
+    def lookup(self, game: GameState):
+        """Returns the book move and score for a setup position, or None if it isn't in the book"""
+        if not game.requires_setup or game.variant != self.variant:
+            return
+        key, symmetry = _key(game)
+        slot = key & self._mask
+        while True:
+            stored = int(self._keys[slot])
+            if stored == key:
+                cell = inverse_symmetries[symmetry][self._moves[slot]]
+                return BookEntry(Move.place(inv_coordinate_index[cell]), float(self._scores[slot]))
+            if not stored:
+                return
+            slot = (slot + 1) & self._mask
+
+
+class MCTSEvaluator:
+    def __init__(self, iterations: int = 1000, time_limit: float = None, **options):
+        """Evaluates a position with an MCTS search, with options passed to the engine"""
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.options = options
+
+    def __call__(self, game: GameState):
+        # A new engine for each position, since a book position's tree is never reused
+        engine = MCTS(**self.options)
+        result = engine.search(game, iterations=self.iterations, time_limit=self.time_limit)
+        return result.move, 2 * result.value - 1
+
+
+def setup_positions(plies: int, variant: str = "standard"):
+    """
+    Returns a game for every setup position with fewer than plies rings placed,
+    keeping one of each set of positions that are symmetries of one another,
+    keyed by their book key
+    """
+    positions = {}
+    layer = [GameState.new_game(variant)]
+    for ply in range(plies):
+        for game in layer:
+            positions[_key(game)[0]] = game
+        if ply == plies - 1:
+            break
+        children = {}
+        for game in layer:
+            for move in game.legal_moves:
+                child = game.copy()
+                child.make_move(move)
+                key = _key(child)[0]
+                if key not in positions:
+                    children.setdefault(key, child)
+        layer = list(children.values())
+    return positions
+
+
+def _evaluate(data: bytes, evaluate: Callable[[GameState], tuple[Move, float]]):
+    """Evaluates packed positions, returning the key, move in key orientation and score of each"""
+    results = []
+    for game in decode_positions(data):
+        key, symmetry = _key(game)
+        move, score = evaluate(game)
+        results.append((key, move.transform(symmetry).src_hex.index, score))
+    return results
+
+
+def build_book(
+    path: str | Path,
+    plies: int = 3,
+    evaluate: Callable[[GameState], tuple[Move, float]] = None,
+    workers: int = None,
+    variant: str = "standard",
+    chunk_size: int = 8,
+):
+    """
+    Evaluates every setup position with fewer than plies rings placed across worker
+    processes and writes the results to a book file at path\n
+    evaluate is any picklable callable returning the move to play in a game and its score
+    for the player to move, an MCTSEvaluator if not given. Positions that are symmetries
+    of one another are evaluated once. Returns the number of positions in the book
+    """
+    evaluate = evaluate if evaluate is not None else MCTSEvaluator()
+    positions = list(setup_positions(plies, variant).values())
+    workers = min(workers or os.cpu_count() or 1, len(positions))
+    chunks = [
+        encode_positions(positions[i : i + chunk_size])
+        for i in range(0, len(positions), chunk_size)
+    ]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        results = [
+            result
+            for chunk in pool.map(_evaluate, chunks, repeat(evaluate))
+            for result in chunk
+        ]
+
+    # Open addressing with linear probing, kept at most half full so probes stay short
+    slots = 1 << max(2 * len(results) - 1, 1).bit_length()
+    table = np.zeros(slots, dtype=ENTRY)
+    for key, move, score in results:
+        slot = key & (slots - 1)
+        while table["key"][slot]:
+            slot = (slot + 1) & (slots - 1)
+        table[slot] = (key, move, score)
+
+    header = np.array(
+        [(MAGIC, variant == "blitz", plies, 0, slots, len(results))], dtype=HEADER
+    )
+    with open(path, "wb") as book:
+        book.write(header.tobytes())
+        book.write(table.tobytes())
+    return len(results)
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(description="Builds an opening book for ring placement")
+    parser.add_argument("path", help="book file to write")
+    parser.add_argument(
+        "--plies", type=int, default=3, help="placements covered from the start of the game"
+    )
+    parser.add_argument("--iterations", type=int, default=1000, help="MCTS iterations per position")
+    parser.add_argument("--workers", type=int, default=None, help="worker processes")
+    parser.add_argument("--variant", choices=("standard", "blitz"), default="standard")
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    positions = build_book(
+        args.path,
+        args.plies,
+        MCTSEvaluator(args.iterations),
+        args.workers,
+        args.variant,
+    )
+    print(f"{positions:,} positions in {time.perf_counter() - start:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,97 @@
+from __future__ import annotations
+
+from dataclasses import astuple, dataclass, fields
+from typing import Iterable
+
+from yinsh.board import Board
+from yinsh.game import GameState
+from yinsh.helpers import popcount, removal_base
+from yinsh.types import Player
+
+
+@dataclass
+class Weights:
+    """Weight of each feature, as a difference between a player and their opponent"""
+
+    rings: float = 1000.0  # Rings removed
+    markers: float = 1.0  # Markers on the board
+    twos: float = 2.0  # Windows holding 2 of the player's markers and none of the opponent's
+    threes: float = 6.0
+    fours: float = 20.0
+    mobility: float = 0.5  # Destinations of the player's rings
+
+
+FEATURES = tuple(field.name for field in fields(Weights))
+
+
+def mobility(board: Board, player: Player):
+    """Counts the destinations of player's rings, without generating their moves"""
+    return board.mobility(player)
+
+
+def _mobility(game: GameState, player: Player):
+    """mobility, taken from the game's cached legal moves when they are player's ring moves"""
+    cached = game._legal_moves
+    if (
+        cached is not None
+        and cached[1]
+        and cached[1][0] < removal_base
+        and player == game.next_player
+        and not game.requires_setup
+        and cached[0] == game.hash
+    ):
+        return len(cached[1])
+    return game.board.mobility(player)
+
+
+def features(game: GameState, player: Player):
+    """
+    Returns the value of each of FEATURES for player less the value for their opponent\n
+    Marker and partial line counts are kept up to date by the board as markers change,
+    and mobility is only counted again along rays through a changed cell, or read from
+    the legal moves already generated for the player to move
+    """
+    board = game.board
+    other = player.other
+    own_lines = board.partial_lines(player)
+    other_lines = board.partial_lines(other)
+    return (
+        game.players[player].rings - game.players[other].rings,
+        popcount(board._marker_masks[player.value]) - popcount(board._marker_masks[other.value]),
+        own_lines[2] - other_lines[2],
+        own_lines[3] - other_lines[3],
+        own_lines[4] - other_lines[4],
+        _mobility(game, player) - _mobility(game, other),
+    )
+
+
+class Evaluator:
+    def __init__(self, weights: Weights = None):
+        """
+        Static evaluation of a position as a weighted sum of FEATURES\n
+        Called as evaluate(game, player), so it can be passed to AlphaBeta(evaluate=...)
+        """
+        self.weights = weights if weights is not None else Weights()
+
+    @property
+    def weights(self):
+        return self._weights
+
+    @weights.setter
+    def weights(self, weights: Weights):
+        self._weights = weights
+        self._vector = astuple(weights)
+
+    def __call__(self, game: GameState, player: Player):
+        """Scores game for player, higher being better"""
+        return sum(w * f for w, f in zip(self._vector, features(game, player)))
+
+    def batch(self, games: Iterable[GameState], player: Player = None):
+        """
+        Scores many games, for player or else for the player to move in each\n
+        The games are scored one at a time and share no work, so this only saves the
+        caller a loop. Each game's mobility comes from its own board's counts
+        """
+        return [
+            self(game, player if player is not None else game.active_player) for game in games
+        ]
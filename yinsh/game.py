@@ -1,12 +1,29 @@
 from __future__ import annotations
 
 import ast
-from typing import Iterator
+from array import array
+from typing import Iterable, Iterator
 
 from yinsh.board import Board
-from yinsh.helpers import inv_coordinate_index, valid_hexes
+from yinsh.helpers import (
+    board_mask,
+    coordinate_index,
+    inv_coordinate_index,
+    iter_bits,
+    move_dst,
+    move_passed,
+    move_src,
+    num_cells,
+    num_symmetries,
+    ray_destinations,
+    rays,
+    removal_base,
+    ring_destinations,
+    symmetries,
+    window_index,
+    windows,
+)
 from yinsh.types import (
-    Direction,
     Hex,
     IllegalMoveError,
     Marker,
@@ -15,18 +32,40 @@ from yinsh.types import (
     Players,
     Ring,
 )
+from yinsh.zobrist import removed_keys, setup_key, white_to_move_key
+
+# Packed positions hold 3 bits per cell, then a byte of flags and a byte of rings removed
+_CELL_BYTES = (3 * num_cells + 7) // 8
+POSITION_SIZE = _CELL_BYTES + 2
+# Cell contents by the codes used in parse_state
+_cell_contents = (None, Ring.WHITE, Ring.BLACK, Marker.WHITE, Marker.BLACK)
+
+# Upper bound on the legal moves of any position, for sizing buffers for MoveGenerator.fill
+MAX_MOVES = max(
+    num_cells,
+    5 * max(sum(len(ray) for ray in cell_rays) for cell_rays in rays),
+    5 * len(windows),
+)
 
 
 class Move:
-    def __init__(self, src_hex: Hex, dst_hex: Hex = None, is_starting: bool = False):
-        if not (dst_hex is not None) ^ is_starting:
+    def __init__(
+        self,
+        src_hex: Hex,
+        dst_hex: Hex = None,
+        is_starting: bool = False,
+        row: list[Hex] = None,
+    ):
+        if (dst_hex is not None) + is_starting + (row is not None) != 1:
             raise ValueError("Move takes exactly 1 type of move as input")
 
         self.src_hex = src_hex
         self.dst_hex = dst_hex
+        self.row = tuple(row) if row is not None else None
 
         self.is_play = dst_hex is not None
         self.is_starting = is_starting
+        self.is_removal = row is not None
 
     @classmethod
     def play(cls, src_hex: Hex, dst_hex: Hex):
@@ -36,17 +75,78 @@ class Move:
     def place(cls, hex: Hex):
         return Move(hex, is_starting=True)
 
+    @classmethod
+    def remove(cls, row: list[Hex], hex: Hex):
+        """Removal of a completed row along with one of the same player's rings"""
+        return Move(hex, row=row)
+
+    @classmethod
+    def from_id(cls, move_id: int, is_starting: bool = False):
+        """
+        Decodes an integer move id\n
+        Placement ids overlap ring move ids, so is_starting selects placements
+        """
+        if is_starting:
+            return Move.place(inv_coordinate_index[move_id])
+        src = inv_coordinate_index[move_src[move_id]]
+        if move_id < removal_base:
+            return Move.play(src, inv_coordinate_index[move_dst[move_id]])
+        return Move.remove([inv_coordinate_index[index] for index in move_passed[move_id]], src)
+
+    @property
+    def id(self):
+        """
+        Integer id of the move, as listed in yinsh.helpers\n
+        A placement is its cell index, a ring move is src * num_cells + dst
+        and a removal is removal_base + window * num_cells + ring
+        """
+        src = coordinate_index[self.src_hex]
+        if self.is_play:
+            return src * num_cells + coordinate_index[self.dst_hex]
+        elif self.is_removal:
+            window = window_index[frozenset(coordinate_index[hex] for hex in self.row)]
+            return removal_base + window * num_cells + src
+        return src
+
+    def transform(self, symmetry: int):
+        """Returns the move mapped through helpers.symmetries[symmetry]"""
+        permutation = symmetries[symmetry]
+
+        def image(hex: Hex):
+            return inv_coordinate_index[permutation[coordinate_index[hex]]]
+
+        if self.is_play:
+            return Move.play(image(self.src_hex), image(self.dst_hex))
+        elif self.is_removal:
+            # Rows of windows are listed in window order, matching the move generator
+            row = [image(hex) for hex in self.row]
+            window = window_index.get(frozenset(coordinate_index[hex] for hex in row))
+            if window is not None:
+                row = [inv_coordinate_index[index] for index in windows[window]]
+            return Move.remove(row, image(self.src_hex))
+        return Move.place(image(self.src_hex))
+
     def __repr__(self):
         if self.is_play:
             return f"Move.play({self.src_hex}, {self.dst_hex})"
+        elif self.is_removal:
+            return f"Move.remove({list(self.row)}, {self.src_hex})"
         else:
             return f"Move.place({self.src_hex})"
 
     def __hash__(self):
-        return hash((self.src_hex, self.dst_hex))
+        return hash((self.src_hex, self.dst_hex, self.row))
 
     def __eq__(self, other: Move):
-        return self.src_hex == other.src_hex and self.dst_hex == other.dst_hex
+        if not isinstance(other, Move):
+            return NotImplemented
+        return (
+            self.is_play == other.is_play
+            and self.is_removal == other.is_removal
+            and self.src_hex == other.src_hex
+            and self.dst_hex == other.dst_hex
+            and self.row == other.row
+        )
 
 
 class MoveGenerator:
@@ -54,43 +154,57 @@ class MoveGenerator:
         self.game = game
 
     def __iter__(self):
-        return self._generate_legal_moves()
-
-    def _generate_legal_moves(self) -> Iterator[Move]:
-        yield from self._generate_starting() if self.game.requires_setup else self._generate_play()
+        return iter(self.game._legal_move_list())
+
+    def _generate_legal_moves(self) -> list[Move]:
+        starting = self.game.requires_setup
+        return [Move.from_id(move_id, starting) for move_id in self._generate_ids()]
+
+    def _generate_ids(self) -> list[int]:
+        """Generates the legal move ids straight from the bitboards, without creating moves"""
+        game = self.game
+        board = game.board
+        if game.requires_setup:
+            return list(iter_bits(board_mask & ~board.occupied))
+
+        # Completed rows must be removed before play continues,
+        # starting with the rows of the player who moved last
+        for player in (game.next_player.other, game.next_player):
+            if board._rows[player.value]:
+                rings = list(iter_bits(board._ring_masks[player.value]))
+                return [
+                    removal_base + window * num_cells + ring
+                    for window in iter_bits(board._rows[player.value])
+                    for ring in rings
+                ]
+
+        rings = board._ring_masks[0] | board._ring_masks[1]
+        markers = board._marker_masks[0] | board._marker_masks[1]
+        return [
+            index * num_cells + dst
+            for index in iter_bits(board._ring_masks[game.next_player.value])
+            for ray in rays[index]
+            for dst in ray_destinations(ray, rings, markers)
+        ]
 
-    def _generate_starting(self):
-        yield from [Move.place(hex) for hex in valid_hexes ^ set(self.game.board._grid.keys())]
+    def count(self):
+        return len(self.game._legal_move_ids())
 
-    def _generate_play(self):
-        for hex, ring in self.game.board.rings.items():
-            if ring.value != self.game.next_player.value:
-                continue
-            # Iterate through each direction, checking each Hex
-            # in that direction until an illegal move or the edge is found
-            for direction in Direction:
-                _prev_is_marker = False
-                current_hex = hex + direction.value
-                while current_hex in valid_hexes:
-                    if self.game.board.rings.get(current_hex) is not None:
-                        # Break from this direction upon reaching another ring
-                        break
-
-                    if self.game.board.markers.get(current_hex) is not None:
-                        _prev_is_marker = True
-                        current_hex += direction.value
-                        continue  # Current Hex won't be valid so we can continue
-
-                    # Current Hex must be empty if we reach this point
-                    yield Move.play(hex, current_hex)
-                    if _prev_is_marker:
-                        # Break from this direction after first empty space following a marker
-                        break
-
-                    current_hex += direction.value
+    def ids(self) -> Iterator[int]:
+        """Iterates over the integer ids of the legal moves, in the same order as the moves"""
+        return iter(self.game._legal_move_ids())
 
-    def count(self):
-        return len(list(self))
+    def fill(self, buffer: array):
+        """
+        Writes the legal move ids into the start of buffer, such as an array("H"),
+        returning how many were written\n
+        A buffer of MAX_MOVES entries always has room
+        """
+        count = 0
+        for move_id in self.ids():
+            buffer[count] = move_id
+            count += 1
+        return count
 
 
 class GameState:
@@ -110,6 +224,12 @@ class GameState:
         self.requires_setup = not is_setup
         self._rings_to_win = 1 if self.variant == "blitz" else 3
 
+        # Undo records for moves made with push, most recent last
+        self._history: list[tuple] = []
+        # Legal move ids along with the hash of the position they were generated for,
+        # and the moves themselves, created from the ids once they are asked for
+        self._legal_moves: tuple[int, list[int], list[Move] | None] | None = None
+
     @classmethod
     def new_game(cls, variant: str = "standard"):
         """
@@ -125,7 +245,7 @@ class GameState:
         players.white.set_rings(0)
         players.black.set_rings(0)
 
-        return GameState(Board.empty(), players, players.white, variant, is_setup=False)
+        return GameState(Board.empty(), players, Player.WHITE, variant, is_setup=False)
 
     @classmethod
     def parse_state(cls, state: dict):
@@ -133,42 +253,154 @@ class GameState:
         players = Players()
         players.white.set_rings(state["rings"]["white"])
         players.black.set_rings(state["rings"]["black"])
-        player = players.white if state["color"] == "w" else players.black
+        player = Player.WHITE if state["color"] == "w" else Player.BLACK
 
         board = Board.empty()
         for i, content in state["grid"].items():
-            hex = inv_coordinate_index[int(i)]
             if content == 0:
                 continue
             elif content == 1:
-                board._grid[hex] = Ring.WHITE
-                board.rings[hex] = Ring.WHITE
+                board._set_cell(int(i), Ring.WHITE)
             elif content == 2:
-                board._grid[hex] = Ring.BLACK
-                board.rings[hex] = Ring.BLACK
+                board._set_cell(int(i), Ring.BLACK)
             elif content == 3:
-                board._grid[hex] = Marker.WHITE
-                board.markers[hex] = Marker.WHITE
+                board._set_cell(int(i), Marker.WHITE)
             elif content == 4:
-                board._grid[hex] = Marker.BLACK
-                board.markers[hex] = Marker.BLACK
+                board._set_cell(int(i), Marker.BLACK)
 
-        is_setup = sum(state["rings"].values()) + len(board.rings) == 10
-        return GameState(board, players, player, state["variant"], is_setup)
+        game = GameState(board, players, player, state["variant"])
+        game._check_rings()
+        rings = players.white.rings + players.black.rings + sum(board._get_ring_count())
+        game.requires_setup = rings != 10
+        return game
 
-    def is_over(self):
-        return (
-            self.players.white.rings == self._rings_to_win
-            or self.players.black.rings == self._rings_to_win
-            or self.legal_moves.count() == 0
+    @classmethod
+    def from_bytes(cls, data: bytes):
+        """Initializes a game of YINSH from a position packed by to_bytes"""
+        if len(data) != POSITION_SIZE:
+            raise ValueError(f"Packed position must be {POSITION_SIZE} bytes")
+        cells = int.from_bytes(data[:_CELL_BYTES], "little")
+        flags, removed = data[_CELL_BYTES], data[_CELL_BYTES + 1]
+        if cells >> 3 * num_cells:
+            raise ValueError("Packed position has content past the last cell")
+
+        board = Board.empty()
+        index = 0
+        while cells:
+            code = cells & 7
+            if code >= len(_cell_contents):
+                raise ValueError(f"Invalid cell content: {code}")
+            if code:
+                board._set_cell(index, _cell_contents[code])
+            cells >>= 3
+            index += 1
+
+        players = Players()
+        players.white.set_rings(removed & 15)
+        players.black.set_rings(removed >> 4)
+        variant = "blitz" if flags & 4 else "standard"
+        game = GameState(board, players, Player(bool(flags & 1)), variant, not flags & 2)
+        game._check_rings()
+        return game
+
+    def _check_rings(self):
+        """Raises ValueError unless each player has removed from 0 to the rings needed to win"""
+        for player in (self.players.white, self.players.black):
+            if type(player.rings) is not int or not 0 <= player.rings <= self._rings_to_win:
+                raise ValueError(f"Invalid rings removed by {player.player.name}: {player.rings!r}")
+
+    def to_bytes(self):
+        """
+        Packs the position into POSITION_SIZE bytes\n
+        Each cell takes 3 bits holding its parse_state content code, in coordinate index order.
+        They are followed by a byte of flags for white to move, setup and the blitz variant,
+        and a byte with the rings removed by white in the low 4 bits and black in the high 4.
+        The undo history is not included
+        """
+        board = self.board
+        cells = 0
+        for code, mask in (
+            (1, board._ring_masks[1]),
+            (2, board._ring_masks[0]),
+            (3, board._marker_masks[1]),
+            (4, board._marker_masks[0]),
+        ):
+            for index in iter_bits(mask):
+                cells |= code << 3 * index
+
+        flags = self.next_player.value | self.requires_setup << 1 | (self.variant == "blitz") << 2
+        removed = self.players.white.rings | self.players.black.rings << 4
+        return cells.to_bytes(_CELL_BYTES, "little") + bytes((flags, removed))
+
+    @property
+    def hash(self):
+        """
+        64-bit Zobrist key of the position\n
+        Combines the incrementally updated board key with the side to move,
+        setup phase and rings removed by each player
+        """
+        key = (
+            self.board.hash
+            ^ removed_keys[1][self.players.white.rings]
+            ^ removed_keys[0][self.players.black.rings]
         )
+        if self.next_player.value:
+            key ^= white_to_move_key
+        if self.requires_setup:
+            key ^= setup_key
+        return key
 
-    def outcome(self):
+    @property
+    def active_player(self):
+        """
+        Player due to make the next move\n
+        This is the player who moved last while they still have completed rows to remove
+        """
+        last = self.next_player.other
+        if not self.requires_setup and self.board._rows[last.value]:
+            return last
+        return self.next_player
+
+    @property
+    def winner(self) -> Player | None:
+        """
+        Player who has removed the rings needed to win, or None\n
+        The game ends as soon as there is a winner, so no moves are legal after that
+        """
         if self.players.white.rings == self._rings_to_win:
-            return Outcome(winner=Player.WHITE)
-        elif self.players.black.rings == self._rings_to_win:
-            return Outcome(winner=Player.BLACK)
-        elif self.legal_moves.count() == 0:
+            return Player.WHITE
+        if self.players.black.rings == self._rings_to_win:
+            return Player.BLACK
+        return None
+
+    def has_legal_move(self):
+        """Checks for any legal move, stopping at the first one found"""
+        if self._legal_moves is not None and self._legal_moves[0] == self.hash:
+            return bool(self._legal_moves[1])
+
+        if self.winner is not None:
+            return False
+        board = self.board
+        if self.requires_setup:
+            return bool(board_mask & ~board.occupied)
+        for player in (self.next_player.other, self.next_player):
+            if board._rows[player.value]:
+                return bool(board._ring_masks[player.value])
+        rings = board._ring_masks[0] | board._ring_masks[1]
+        markers = board._marker_masks[0] | board._marker_masks[1]
+        return any(
+            next(ring_destinations(index, rings, markers), None) is not None
+            for index in iter_bits(board._ring_masks[self.next_player.value])
+        )
+
+    def is_over(self):
+        return not self.has_legal_move()
+
+    def outcome(self):
+        winner = self.winner
+        if winner is not None:
+            return Outcome(winner=winner)
+        elif not self.has_legal_move():
             if self.players.white.rings == self.players.black.rings:
                 return Outcome(winner="DRAW")
             else:
@@ -178,8 +410,56 @@ class GameState:
                     else Player.BLACK
                 )
 
+    def copy(self):
+        """Returns an independent copy of the game, including its undo history"""
+        game = GameState(
+            self.board.copy(),
+            self.players.copy(),
+            self.next_player,
+            self.variant,
+            is_setup=not self.requires_setup,
+        )
+        game._history = self._history.copy()
+        return game
+
+    def transform(self, symmetry: int):
+        """
+        Returns the position mapped through helpers.symmetries[symmetry], a rotation
+        and or reflection of the board, without the undo history
+        """
+        return GameState(
+            self.board.transform(symmetry),
+            self.players.copy(),
+            self.next_player,
+            self.variant,
+            is_setup=not self.requires_setup,
+        )
+
+    def canonical_hash(self):
+        """
+        Returns the smallest hash of the position over the symmetries of the board, which
+        positions that are symmetries of one another share, and the symmetry that gives it
+        """
+        rest = self.hash ^ self.board.hash
+        best, best_symmetry = self.hash, 0
+        for symmetry in range(1, num_symmetries):
+            key = self.board.symmetric_hash(symmetry) ^ rest
+            if key < best:
+                best, best_symmetry = key, symmetry
+        return best, best_symmetry
+
+    def canonical(self):
+        """
+        Returns the canonical form of the position and the symmetry that maps the position
+        onto it\n
+        The canonical form is the image of the position with the smallest hash. Moves are
+        mapped onto the canonical form with Move.transform, and back with the inverse symmetry
+        """
+        _, symmetry = self.canonical_hash()
+        return self.transform(symmetry), symmetry
+
     def make_move(self, move: Move):
-        if move.is_play and self.requires_setup:
+        if not move.is_starting and self.requires_setup:
             raise IllegalMoveError("Board requires setup")
         elif move.is_starting and not self.requires_setup:
             raise IllegalMoveError("Max rings reached")
@@ -197,6 +477,47 @@ class GameState:
             self.board.move_ring(self.next_player, move.src_hex, move.dst_hex)
             self.next_player = self.next_player.other
 
+        elif move.is_removal:
+            ring = self.board._ring(move.src_hex)
+            if ring is None:
+                raise IllegalMoveError(f"Hex must contain ring: {move.src_hex}")
+            rows = self.board.get_rows(Player(ring.value))
+            if set(move.row) not in [set(row) for row in rows]:
+                raise IllegalMoveError(f"Row must be completed by the ring's owner: {move.row}")
+            self.complete_row(move.row)
+            self.remove_ring(move.src_hex)
+
+    def push(self, move: Move):
+        """Makes a move, recording what it changes so it can be reversed with pop"""
+        flipped = 0
+        owner = None
+        if move.is_play:
+            flipped = self.board._flipped_by(move.src_hex, move.dst_hex)
+        elif move.is_removal:
+            ring = self.board._ring(move.src_hex)
+            owner = Player(ring.value) if ring is not None else None
+
+        record = (move, self.next_player, self.requires_setup, flipped, owner)
+        self.make_move(move)
+        self._history.append(record)
+
+    def pop(self):
+        """Reverses the last move made with push and returns it"""
+        move, next_player, requires_setup, flipped, owner = self._history.pop()
+
+        if move.is_starting:
+            self.board._remove_ring(move.src_hex)
+        elif move.is_play:
+            self.board._unmove_ring(next_player, move.src_hex, move.dst_hex, flipped)
+        elif move.is_removal:
+            self.board._restore_row(owner, move.row)
+            self.board._restore_ring(owner, move.src_hex)
+            self.players[owner].rings -= 1
+
+        self.next_player = next_player
+        self.requires_setup = requires_setup
+        return move
+
     def complete_row(self, row: list[Hex]):
         self.board._complete_row(row)
 
@@ -210,3 +531,46 @@ class GameState:
     @property
     def legal_moves(self):
         return MoveGenerator(self)
+
+    def _legal_move_ids(self) -> list[int]:
+        """
+        Ids of the legal moves of the position, generated once and reused until it changes\n
+        The ids are kept with the position hash, so any change to the game clears them,
+        including changes made directly to the board or next_player
+        """
+        key = self.hash
+        if self._legal_moves is None or self._legal_moves[0] != key:
+            ids = MoveGenerator(self)._generate_ids() if self.winner is None else []
+            self._legal_moves = (key, ids, None)
+        return self._legal_moves[1]
+
+    def _legal_move_list(self) -> list[Move]:
+        """Legal moves of the position, created from the cached ids when first needed"""
+        ids = self._legal_move_ids()
+        if self._legal_moves[2] is None:
+            cells = inv_coordinate_index
+            if self.requires_setup:
+                moves = [Move.place(cells[move_id]) for move_id in ids]
+            elif ids and ids[0] < removal_base:
+                # Ring moves are the common case, so they are built without going through from_id
+                moves = [Move.play(cells[move_src[i]], cells[move_dst[i]]) for i in ids]
+            else:
+                moves = [Move.from_id(move_id) for move_id in ids]
+            self._legal_moves = (self._legal_moves[0], ids, moves)
+        return self._legal_moves[2]
+
+
+def encode_positions(games: Iterable[GameState]):
+    """Packs games into one buffer of consecutive POSITION_SIZE records"""
+    return b"".join(game.to_bytes() for game in games)
+
+
+def decode_positions(data: bytes):
+    """Unpacks a buffer written by encode_positions into a list of games"""
+    if len(data) % POSITION_SIZE:
+        raise ValueError(f"Buffer length must be a multiple of {POSITION_SIZE}")
+    view = memoryview(data)
+    return [
+        GameState.from_bytes(view[offset : offset + POSITION_SIZE])
+        for offset in range(0, len(data), POSITION_SIZE)
+    ]
@@ -1,6 +1,9 @@
 from __future__ import annotations
 
-from yinsh.types import Direction, Hex
+from array import array
+from typing import Iterator
+
+from yinsh.types import Direction, Hex, board_cells
 
 
 def distance(a: Hex, b: Hex):
@@ -51,22 +54,194 @@ def hex_linedraw(a: Hex, b: Hex):
 
 
 def straight_line(a: Hex, b: Hex):
-    n = distance(a, b)
-    for direction in Direction:
-        scaled_hex = direction.value.scale(n)
-        if a + scaled_hex == b:
-            return hex_linedraw(a, b)
+    src = coordinate_index.get(a)
+    dst = coordinate_index.get(b)
+    if src is None or dst is None or src == dst:
+        n = distance(a, b)
+        for direction in Direction:
+            scaled_hex = direction.value.scale(n)
+            if a + scaled_hex == b:
+                return hex_linedraw(a, b)
+        return None
+
+    line = line_between(src, dst)
+    if line is not None:
+        return [a, *(inv_coordinate_index[index] for index in line[1]), b]
+
+
+def line_between(src: int, dst: int):
+    """
+    Looks up the straight line between two cells given by coordinate index\n
+    Returns the direction from src to dst and the indices of the cells strictly between them,
+    or None if the cells are not on a common line
+    """
+    return _lines[src * num_cells + dst]
+
+
+def iter_bits(mask: int):
+    """Yields the index of each set bit in mask, lowest first"""
+    while mask:
+        low = mask & -mask
+        yield low.bit_length() - 1
+        mask ^= low
 
 
-inv_coordinate_index: dict[int, Hex] = {}
+def popcount(mask: int):
+    """Counts the set bits in mask"""
+    return bin(mask).count("1")
 
-inv_coordinate_index[0] = Hex(0, 0)
-idx = 1
-for q in range(-5, 6):
-    for r in range(-5, 6):
-        if -5 <= -q - r <= 5 and not ((abs(q) == 5 or q == 0) and (abs(r) == 5 or r == 0)):
-            inv_coordinate_index[idx] = Hex(q, r)
-            idx += 1
+
+if hasattr(int, "bit_count"):
+    # Python 3.10 and later count bits natively, which is much faster on the board's hot paths
+    popcount = int.bit_count  # noqa: F811
+
+
+inv_coordinate_index: dict[int, Hex] = {hex.index: hex for hex in board_cells}
 
 coordinate_index = {coord: i for i, coord in inv_coordinate_index.items()}
 valid_hexes = set(coordinate_index.keys())
+
+
+# Bitboard with a bit set for every board cell, bit i being inv_coordinate_index[i]
+board_mask = (1 << len(inv_coordinate_index)) - 1
+
+num_cells = len(inv_coordinate_index)
+
+# Cells in each direction from every cell, ordered outwards to the edge of the board.
+# rays[i][d] is the ray from cell i in the d-th member of Direction
+rays: list[tuple[tuple[int, ...], ...]] = []
+for index in range(num_cells):
+    cell_rays = []
+    for direction in Direction:
+        ray = []
+        hex = inv_coordinate_index[index] + direction.value
+        while hex in coordinate_index:
+            ray.append(coordinate_index[hex])
+            hex += direction.value
+        cell_rays.append(tuple(ray))
+    rays.append(tuple(cell_rays))
+
+# Bitboards of the cells on the rays from each cell, and the index of the ray from
+# src that passes dst, by src * num_cells + dst, or -1 if they aren't on a line
+line_masks = [0] * num_cells
+ray_direction = array("b", [-1]) * (num_cells * num_cells)
+for index, cell_rays in enumerate(rays):
+    for direction, ray in enumerate(cell_rays):
+        for cell in ray:
+            line_masks[index] |= 1 << cell
+            ray_direction[index * num_cells + cell] = direction
+
+
+def ray_destinations(ray: tuple[int, ...], rings: int, markers: int) -> Iterator[int]:
+    """
+    Generates the cells along ray that a ring at its start can move to,
+    given masks of all rings and markers\n
+    A ring moves over empty cells and markers, stopping before another ring
+    and on the first empty cell after any markers it jumps
+    """
+    after_marker = False
+    for current in ray:
+        if rings >> current & 1:
+            break
+        if markers >> current & 1:
+            after_marker = True
+            continue
+        yield current
+        if after_marker:
+            break
+
+
+def ring_destinations(index: int, rings: int, markers: int) -> Iterator[int]:
+    """Generates the cells the ring at index can move to, given masks of all rings and markers"""
+    for ray in rays[index]:
+        yield from ray_destinations(ray, rings, markers)
+
+
+# Lines between every pair of cells, indexed by src * num_cells + dst.
+# between_masks holds the same cells as a bitboard, for flipping markers in one step
+_lines: list[tuple[Direction, tuple[int, ...]] | None] = [None] * (num_cells * num_cells)
+between_masks = [0] * (num_cells * num_cells)
+for index, cell_rays in enumerate(rays):
+    for direction, ray in zip(Direction, cell_rays):
+        mask = 0
+        for n, dst in enumerate(ray):
+            _lines[index * num_cells + dst] = (direction, ray[:n])
+            between_masks[index * num_cells + dst] = mask
+            mask |= 1 << dst
+
+# Every line of five cells on the board, read from each cell along N, NE and SE so that each
+# line appears once. cell_windows[i] is a bitmask of the windows, by position, holding cell i
+windows: list[tuple[int, ...]] = []
+window_masks: list[int] = []
+cell_windows = [0] * num_cells
+for index in range(num_cells):
+    for direction in (Direction.N, Direction.NE, Direction.SE):
+        ray = rays[index][list(Direction).index(direction)]
+        if len(ray) < 4:
+            continue
+        window = (index, *ray[:4])
+        for cell in window:
+            cell_windows[cell] |= 1 << len(windows)
+        windows.append(window)
+        window_masks.append(sum(1 << cell for cell in window))
+
+# Window ids by their cells, for finding the window of a completed row in any order
+window_index = {frozenset(window): i for i, window in enumerate(windows)}
+
+# Integer move ids, which all fit in 16 bits. A placement is its cell index and a ring move
+# is src * num_cells + dst, so the two overlap, but a position only ever allows one kind.
+# A removal is removal_base + window * num_cells + ring.
+# For ring moves and removals, move_src holds the ring's cell, move_dst the destination
+# (-1 for removals) and move_passed the cells passed over, or the row for removals.
+# move_passed is None for ids of ring moves between cells that aren't on a line
+removal_base = num_cells * num_cells
+num_move_ids = removal_base + len(windows) * num_cells
+move_src = array("B", bytes(num_move_ids))
+move_dst = array("b", [-1]) * num_move_ids
+move_passed: list[tuple[int, ...] | None] = [None] * num_move_ids
+for move_id in range(removal_base):
+    move_src[move_id], move_dst[move_id] = divmod(move_id, num_cells)
+    if _lines[move_id] is not None:
+        move_passed[move_id] = _lines[move_id][1]
+for move_id in range(removal_base, num_move_ids):
+    window, move_src[move_id] = divmod(move_id - removal_base, num_cells)
+    move_passed[move_id] = windows[window]
+
+
+def _reflect_rotate(hex: Hex, rotation: int, reflect: bool):
+    """Swaps the r and s coordinates of hex if reflect, then rotates it 60° rotation times"""
+    q, r, s = hex.cube
+    if reflect:
+        r, s = s, r
+    for _ in range(rotation):
+        q, r, s = -r, -s, -q
+    return Hex(q, r, s)
+
+
+# The 12 symmetries of the board, its 6 rotations each with and without a reflection,
+# as permutations of coordinate indices. symmetries[t][i] is the cell that cell i maps to
+# under symmetry t, and inverse_symmetries[t] undoes it. symmetries[0] is the identity
+symmetries: list[tuple[int, ...]] = [
+    tuple(
+        coordinate_index[_reflect_rotate(inv_coordinate_index[index], rotation, reflect)]
+        for index in range(num_cells)
+    )
+    for reflect in (False, True)
+    for rotation in range(6)
+]
+inverse_symmetries: list[tuple[int, ...]] = []
+for permutation in symmetries:
+    inverse = [0] * num_cells
+    for index, image in enumerate(permutation):
+        inverse[image] = index
+    inverse_symmetries.append(tuple(inverse))
+num_symmetries = len(symmetries)
+
+
+def transform_mask(mask: int, symmetry: int):
+    """Maps a bitboard through symmetries[symmetry]"""
+    permutation = symmetries[symmetry]
+    result = 0
+    for index in iter_bits(mask):
+        result |= 1 << permutation[index]
+    return result
@@ -0,0 +1,214 @@
+from __future__ import annotations
+
+import math
+import time
+from dataclasses import dataclass
+from random import Random
+
+from yinsh.game import GameState, Move
+from yinsh.types import Player
+
+
+class Node:
+    __slots__ = ("move", "player", "parent", "children", "untried", "visits", "value", "key")
+
+    def __init__(self, move: Move | None, player: Player | None, parent: Node | None, key: int):
+        """
+        Search tree node for the position reached by move\n
+        value is the total reward of player, the player who made the move
+        """
+        self.move = move
+        self.player = player
+        self.parent = parent
+        self.key = key
+
+        self.children: list[Node] = []
+        self.untried: list[Move] | None = None  # Filled in when the node is first expanded
+        self.visits = 0
+        self.value = 0.0
+
+
+@dataclass
+class MoveStats:
+    move: Move
+    visits: int
+    value: float  # Mean reward for the player making the move, from 0 (loss) to 1 (win)
+
+
+@dataclass
+class SearchResult:
+    move: Move
+    value: float
+    visits: int
+    iterations: int
+    elapsed: float
+    pv: list[Move]
+    moves: list[MoveStats]
+
+
+class MCTS:
+    def __init__(
+        self,
+        exploration: float = 1.4,
+        rollout_limit: int = 200,
+        reuse_depth: int = 4,
+        seed: int = None,
+    ):
+        """
+        Monte Carlo Tree Search engine using UCT selection and random rollouts\n
+        exploration is the UCT constant, rollout_limit caps the length of each rollout,
+        after which the player with more rings removed is scored as the winner.
+        The tree is kept between searches, and a search from a position up to
+        reuse_depth moves below the previous root continues from that subtree
+        """
+        self.exploration = exploration
+        self.rollout_limit = rollout_limit
+        self.reuse_depth = reuse_depth
+        self._random = Random(seed)
+
+        self.root: Node | None = None
+
+    def seed(self, seed: int):
+        """Reseeds the random number generator used for expansion and rollouts"""
+        self._random.seed(seed)
+
+    def search(
+        self, game: GameState, iterations: int = None, time_limit: float = None, stop=None
+    ):
+        """
+        Searches from the given game, which is left unchanged\n
+        Runs until the number of iterations or the time limit in seconds is reached,
+        whichever comes first. At least one of them must be given.
+        stop is an optional event, such as a threading.Event, that ends the search early
+        once it is set. At least one iteration is always run
+        """
+        if iterations is None and time_limit is None:
+            raise ValueError("Search requires an iteration or time limit")
+        if iterations is not None and iterations < 1:
+            raise ValueError("Search requires at least one iteration")
+
+        state = game.copy()
+        self.root = self._find_root(state)
+
+        start = time.perf_counter()
+        deadline = start + time_limit if time_limit is not None else math.inf
+        completed = 0
+        while iterations is None or completed < iterations:
+            self._iterate(state, self.root)
+            completed += 1
+            if time.perf_counter() >= deadline or (stop is not None and stop.is_set()):
+                break
+
+        return self._result(completed, time.perf_counter() - start)
+
+    def advance(self, move: Move):
+        """Moves the root of the tree to the child reached by move, discarding the rest"""
+        if self.root is not None:
+            for child in self.root.children:
+                if child.move == move:
+                    child.parent = None
+                    self.root = child
+                    return
+        self.root = None
+
+    def _find_root(self, game: GameState):
+        key = game.hash
+        level = [self.root] if self.root is not None else []
+        for _ in range(self.reuse_depth + 1):
+            for node in level:
+                if node.key == key:
+                    node.parent = None
+                    return node
+            level = [child for node in level for child in node.children]
+        return Node(None, None, None, key)
+
+    def _iterate(self, game: GameState, root: Node):
+        node = root
+        depth = 0
+        while True:
+            if node.untried is None:
+                node.untried = list(game.legal_moves)
+                self._random.shuffle(node.untried)
+
+            # Expansion
+            if node.untried:
+                move = node.untried.pop()
+                player = game.active_player
+                game.push(move)
+                depth += 1
+                child = Node(move, player, node, game.hash)
+                node.children.append(child)
+                node = child
+                break
+
+            # Terminal position
+            if not node.children:
+                break
+
+            # Selection
+            node = self._select(node)
+            game.push(node.move)
+            depth += 1
+
+        reward = self._rollout(game)
+
+        # Backpropagation
+        while node is not None:
+            node.visits += 1
+            if node.player is not None:
+                node.value += reward if node.player.value else 1 - reward
+            node = node.parent
+
+        for _ in range(depth):
+            game.pop()
+
+    def _select(self, node: Node):
+        log_visits = math.log(node.visits)
+        return max(
+            node.children,
+            key=lambda child: child.value / child.visits
+            + self.exploration * math.sqrt(log_visits / child.visits),
+        )
+
+    def _rollout(self, game: GameState):
+        """Plays random moves from game, returning the reward for white"""
+        depth = 0
+        while depth < self.rollout_limit:
+            moves = list(game.legal_moves)
+            if not moves:
+                break
+            game.push(self._random.choice(moves))
+            depth += 1
+
+        white, black = game.players.white.rings, game.players.black.rings
+        reward = 1.0 if white > black else 0.0 if white < black else 0.5
+
+        for _ in range(depth):
+            game.pop()
+        return reward
+
+    def _result(self, iterations: int, elapsed: float):
+        children = sorted(self.root.children, key=lambda child: child.visits, reverse=True)
+        if not children:
+            raise ValueError("Game is over")
+
+        pv = []
+        node = self.root
+        while node.children:
+            node = max(node.children, key=lambda child: child.visits)
+            pv.append(node.move)
+
+        best = children[0]
+        stats = [
+            MoveStats(child.move, child.visits, child.value / child.visits) for child in children
+        ]
+        return SearchResult(
+            move=best.move,
+            value=best.value / best.visits,
+            visits=self.root.visits,
+            iterations=iterations,
+            elapsed=elapsed,
+            pv=pv,
+            moves=stats,
+        )
+
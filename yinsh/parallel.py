@@ -0,0 +1,102 @@
+from __future__ import annotations
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from random import randrange
+
+from yinsh.game import GameState, Move
+from yinsh.mcts import MCTS, MoveStats, SearchResult
+
+# Engine of the current worker process, kept between searches so its tree can be reused
+_engine: MCTS | None = None
+
+
+def _init_worker(options: dict):
+    global _engine
+    _engine = MCTS(**options)
+
+
+def _ping():
+    return os.getpid()
+
+
+def _search(game: GameState, iterations: int, time_limit: float, seed: int):
+    _engine.seed(seed)
+    return _engine.search(game, iterations=iterations, time_limit=time_limit)
+
+
+class ParallelMCTS:
+    def __init__(self, workers: int = None, **options):
+        """
+        Root-parallel MCTS over a persistent pool of worker processes\n
+        Each worker runs an independent search from the same game with its own seed,
+        and the visits and values of the root moves are merged before choosing a move.
+        Other keyword arguments are passed to the MCTS engine in each worker.
+        The pool is started and warmed up here, so searches don't pay for process start-up
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self._pool = ProcessPoolExecutor(
+            max_workers=self.workers, initializer=_init_worker, initargs=(options,)
+        )
+        # Processes are started on demand, so give every worker a task to bring it up now
+        for future in [self._pool.submit(_ping) for _ in range(self.workers)]:
+            future.result()
+
+    def search(
+        self, game: GameState, iterations: int = None, time_limit: float = None, seed: int = None
+    ):
+        """
+        Searches from the given game in every worker and merges the results\n
+        iterations and time_limit apply to each worker's search
+        """
+        if iterations is None and time_limit is None:
+            raise ValueError("Search requires an iteration or time limit")
+
+        seed = seed if seed is not None else randrange(2**32)
+        start = time.perf_counter()
+        futures = [
+            self._pool.submit(_search, game, iterations, time_limit, seed + i)
+            for i in range(self.workers)
+        ]
+        results = [future.result() for future in futures]
+        return merge_results(results, time.perf_counter() - start)
+
+    def close(self):
+        self._pool.shutdown()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+def merge_results(results: list[SearchResult], elapsed: float):
+    """Combines searches from the same position by summing visits and values per root move"""
+    visits: dict[Move, int] = {}
+    values: dict[Move, float] = {}
+    for result in results:
+        for stats in result.moves:
+            visits[stats.move] = visits.get(stats.move, 0) + stats.visits
+            values[stats.move] = values.get(stats.move, 0.0) + stats.value * stats.visits
+
+    moves = sorted(visits, key=lambda move: visits[move], reverse=True)
+    stats = [MoveStats(move, visits[move], values[move] / visits[move]) for move in moves]
+    best = stats[0]
+
+    # Principal variation of the worker that spent the most visits on the chosen move
+    pv = [best.move]
+    candidates = [result for result in results if result.pv[0] == best.move]
+    if candidates:
+        pv = max(candidates, key=lambda result: result.moves[0].visits).pv
+
+    return SearchResult(
+        move=best.move,
+        value=best.value,
+        visits=sum(result.visits for result in results),
+        iterations=sum(result.iterations for result in results),
+        elapsed=elapsed,
+        pv=pv,
+        moves=stats,
+    )
@@ -0,0 +1,157 @@
+from __future__ import annotations
+
+import argparse
+import sys
+import time
+from dataclasses import dataclass
+
+from yinsh.game import GameState
+
+# Packed positions (see GameState.to_bytes) with known-good perft counts by depth
+POSITIONS = {
+    # Empty board with white to place the first ring
+    "start": (
+        "00000000000000000000000000000000000000000000000000000000000000000300",
+        {1: 85, 2: 7140, 3: 592620},
+    ),
+    # All 10 rings placed, no markers
+    "setup": (
+        "01000000000000000000000048120000040000200100004000000002000000000100",
+        {1: 54, 2: 2784, 3: 153973},
+    ),
+    # 14 random ring moves after setup
+    "midgame": (
+        "010000400820800000084600d8380000080102400100008003060004028000200100",
+        {1: 54, 2: 2805, 3: 143943},
+    ),
+    # White has completed a row, and black is to move once it has been removed
+    "removal": (
+        "010000000000000060db060048120000040000200100004000000002000000000000",
+        {1: 5, 2: 278, 3: 13312},
+    ),
+}
+
+PHASES = ("setup", "removal", "play")
+
+
+def load_position(name: str):
+    return GameState.from_bytes(bytes.fromhex(POSITIONS[name][0]))
+
+
+def perft(game: GameState, depth: int):
+    """
+    Counts the positions reached from game after exactly depth moves\n
+    Ring placements, ring moves and each choice of row and ring to remove all count as moves.
+    The game is left unchanged
+    """
+    if depth == 0:
+        return 1
+    moves = list(game.legal_moves)
+    if depth == 1:
+        return len(moves)
+    nodes = 0
+    for move in moves:
+        game.push(move)
+        nodes += perft(game, depth - 1)
+        game.pop()
+    return nodes
+
+
+@dataclass
+class PhaseStats:
+    nodes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def nodes_per_second(self):
+        return self.nodes / self.seconds if self.seconds else 0.0
+
+
+def profile(game: GameState, depth: int):
+    """
+    Runs perft, splitting the work by the phase of each position moves are generated from\n
+    Returns the perft count and PhaseStats for each phase, holding the moves generated
+    in that phase and the time spent generating, making and unmaking them
+    """
+    stats = {phase: PhaseStats() for phase in PHASES}
+    leaves, _ = _profile(game, depth, stats)
+    return leaves, stats
+
+
+def _profile(game: GameState, depth: int, stats: dict[str, PhaseStats]):
+    """Returns the perft count and time of the subtree, after adding its own time to stats"""
+    if depth == 0:
+        return 1, 0.0
+    start = time.perf_counter()
+    moves = list(game.legal_moves)
+    if not moves:
+        return 0, time.perf_counter() - start
+
+    if game.requires_setup:
+        phase = stats["setup"]
+    elif moves[0].is_removal:
+        phase = stats["removal"]
+    else:
+        phase = stats["play"]
+    phase.nodes += len(moves)
+
+    leaves = len(moves)
+    children = 0.0
+    if depth > 1:
+        leaves = 0
+        for move in moves:
+            game.push(move)
+            subtree, elapsed = _profile(game, depth - 1, stats)
+            game.pop()
+            leaves += subtree
+            children += elapsed
+
+    elapsed = time.perf_counter() - start
+    phase.seconds += elapsed - children
+    return leaves, elapsed
+
+
+def main(argv: list[str] = None):
+    parser = argparse.ArgumentParser(
+        description="Checks move generation against known perft counts and measures its speed"
+    )
+    parser.add_argument("--depth", type=int, default=2, help="deepest depth to check")
+    parser.add_argument(
+        "positions", nargs="*", help=f"positions to run, all by default: {', '.join(POSITIONS)}"
+    )
+    args = parser.parse_args(argv)
+    for name in args.positions:
+        if name not in POSITIONS:
+            parser.error(f"unknown position: {name}")
+
+    failed = False
+    for name in args.positions or POSITIONS:
+        game = load_position(name)
+        counts = POSITIONS[name][1]
+        for depth in range(1, args.depth + 1):
+            start = time.perf_counter()
+            leaves, stats = profile(game, depth)
+            elapsed = time.perf_counter() - start
+            nodes = sum(phase.nodes for phase in stats.values())
+
+            expected = counts.get(depth)
+            status = "?" if expected is None else "ok" if leaves == expected else "FAIL"
+            failed |= status == "FAIL"
+
+            phases = ", ".join(
+                f"{phase} {stats[phase].nodes_per_second:,.0f}/s"
+                for phase in PHASES
+                if stats[phase].nodes
+            )
+            print(
+                f"{name:<8} depth {depth}  {leaves:>10,} {status:<4} "
+                f"{nodes / elapsed:>10,.0f} nodes/s  ({phases})"
+            )
+            if expected is not None and leaves != expected:
+                print(f"         expected {expected:,}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import os
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from random import Random, randrange
+from typing import Callable
+
+import numpy as np
+
+from yinsh.batch import encode
+from yinsh.game import GameState, Move
+from yinsh.helpers import num_cells, window_index
+from yinsh.mcts import MCTS
+
+# Kinds of move in a record
+PLACE, PLAY, REMOVE = range(3)
+
+# One position and the move chosen from it. cells uses the content codes of yinsh.batch,
+# white is True when white is next to move, removed is indexed by Player.value,
+# src and dst are coordinate indices and row is the index of the removed window,
+# with -1 where they don't apply. outcome is 1 for a white win, -1 for a black win, 0 for a draw,
+# and truncated is True when the game was stopped at max_moves, with outcome then scored
+# by the rings removed so far
+RECORD = np.dtype(
+    [
+        ("cells", "i1", (num_cells,)),
+        ("white", "?"),
+        ("setup", "?"),
+        ("removed", "u1", (2,)),
+        ("kind", "u1"),
+        ("src", "i1"),
+        ("dst", "i1"),
+        ("row", "i1"),
+        ("outcome", "i1"),
+        ("truncated", "?"),
+    ]
+)
+
+SHARD_SUFFIX = ".bin"
+
+
+class RandomBot:
+    def __init__(self, seed: int = None):
+        """Plays uniformly random legal moves"""
+        self._random = Random(seed)
+
+    def seed(self, seed: int):
+        self._random.seed(seed)
+
+    def __call__(self, game: GameState):
+        return self._random.choice(list(game.legal_moves))
+
+
+class MCTSBot:
+    def __init__(self, iterations: int = 200, time_limit: float = None, **options):
+        """Plays the move chosen by an MCTS search, with options passed to the engine"""
+        self.iterations = iterations
+        self.time_limit = time_limit
+        self.engine = MCTS(**options)
+
+    def seed(self, seed: int):
+        self.engine.seed(seed)
+
+    def __call__(self, game: GameState):
+        result = self.engine.search(game, iterations=self.iterations, time_limit=self.time_limit)
+        return result.move
+
+
+def _record(game: GameState, move: Move):
+    dst = row = -1
+    if move.is_starting:
+        kind = PLACE
+    elif move.is_play:
+        kind = PLAY
+        dst = move.dst_hex.index
+    else:
+        kind = REMOVE
+        row = window_index[frozenset(hex.index for hex in move.row)]
+    removed = (game.players.black.rings, game.players.white.rings)
+    return (
+        encode(game),
+        game.next_player.value,
+        game.requires_setup,
+        removed,
+        kind,
+        move.src_hex.index,
+        dst,
+        row,
+        0,
+        False,
+    )
+
+
+def play_game(bot: Callable[[GameState], Move], variant: str = "standard", max_moves: int = 500):
+    """Plays a game of bot against itself, returning a record for every position"""
+    game = GameState.new_game(variant)
+    records = []
+    while len(records) < max_moves:
+        if not game.has_legal_move():
+            break
+        move = bot(game)
+        records.append(_record(game, move))
+        game.make_move(move)
+
+    array = np.array(records, dtype=RECORD)
+    array["outcome"] = np.sign(game.players.white.rings - game.players.black.rings)
+    array["truncated"] = game.has_legal_move()
+    return array
+
+
+def _play_games(path: str, games: int, bot, seed: int, variant: str, max_moves: int):
+    if hasattr(bot, "seed"):
+        bot.seed(seed)
+    positions = 0
+    with open(path, "ab") as shard:
+        for _ in range(games):
+            records = play_game(bot, variant, max_moves)
+            # Whole games are appended at once, so a shard never holds part of a game
+            shard.write(records.tobytes())
+            shard.flush()
+            positions += len(records)
+    return positions
+
+
+def shard_paths(directory: str | Path):
+    return sorted(Path(directory).glob(f"shard-*{SHARD_SUFFIX}"))
+
+
+def self_play(
+    directory: str | Path,
+    games: int,
+    bot: Callable[[GameState], Move] = None,
+    workers: int = None,
+    seed: int = None,
+    variant: str = "standard",
+    max_moves: int = 500,
+):
+    """
+    Plays games of bot against itself across worker processes, streaming every position
+    to append-only shard files in directory\n
+    bot is any picklable callable returning a move for a game, and a random player
+    if not given. Each worker writes its games to a new shard of RECORD entries,
+    which open_shards maps back into arrays. Returns the number of positions written
+    """
+    if games < 0:
+        raise ValueError("Number of games must not be negative")
+    if workers is not None and workers < 1:
+        raise ValueError("Self-play requires at least one worker")
+    if not games:
+        return 0
+    bot = bot if bot is not None else RandomBot()
+    workers = min(workers or os.cpu_count() or 1, games)
+    seed = seed if seed is not None else randrange(2**32)
+
+    directory = Path(directory)
+    directory.mkdir(parents=True, exist_ok=True)
+    first = len(shard_paths(directory))
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(
+                _play_games,
+                str(directory / f"shard-{first + i:05d}{SHARD_SUFFIX}"),
+                games // workers + (i < games % workers),
+                bot,
+                seed + i,
+                variant,
+                max_moves,
+            )
+            for i in range(workers)
+        ]
+        return sum(future.result() for future in futures)
+
+
+def open_shards(directory: str | Path):
+    """Memory-maps every non-empty shard in directory as a read-only array of RECORD"""
+    return [
+        np.memmap(path, dtype=RECORD, mode="r")
+        for path in shard_paths(directory)
+        if path.stat().st_size
+    ]
@@ -0,0 +1,167 @@
+from __future__ import annotations
+
+from enum import IntEnum
+from multiprocessing import shared_memory
+from typing import NamedTuple
+
+_MASK_64 = (1 << 64) - 1
+
+# Bytes per entry: key (8), value (8), depth (4), move (4), bound (1), age (1)
+ENTRY_SIZE = 26
+_HEADER_SIZE = 8
+
+
+class Bound(IntEnum):
+    EXACT = 1
+    LOWER = 2
+    UPPER = 3
+
+
+class Entry(NamedTuple):
+    value: float
+    bound: Bound
+    depth: int
+    move: int
+
+
+class TranspositionTable:
+    def __init__(self, size_mb: float = 16, shared: bool = False, name: str = None):
+        """
+        Fixed-size table of search results keyed by position hash\n
+        Entries hold a value or bound, the depth (or visit count) it was found at
+        and the best move as an integer, -1 if there is none.
+        The table never grows past size_mb; colliding entries are replaced
+        when the new result is deeper or the stored one is from an older search.\n
+        If shared is True the table is allocated in shared memory, which other
+        processes can open with TranspositionTable.attach(table.name).
+        Passing name attaches to an existing shared table instead of creating one
+        """
+        self._shm = None
+        if name is not None:
+            self._shm = shared_memory.SharedMemory(name=name)
+            buffer = self._shm.buf
+            self.size = int.from_bytes(buffer[:_HEADER_SIZE], "little")
+        else:
+            self.size = max(1, int(size_mb * 2**20) // ENTRY_SIZE)
+            nbytes = _HEADER_SIZE + self.size * ENTRY_SIZE
+            if shared:
+                self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+                buffer = self._shm.buf
+                buffer[:nbytes] = bytes(nbytes)
+            else:
+                buffer = memoryview(bytearray(nbytes))
+            buffer[:_HEADER_SIZE] = self.size.to_bytes(_HEADER_SIZE, "little")
+
+        n = self.size
+        offset = _HEADER_SIZE
+        self._keys = buffer[offset : offset + 8 * n].cast("Q")
+        offset += 8 * n
+        self._values = buffer[offset : offset + 8 * n].cast("d")
+        offset += 8 * n
+        self._depths = buffer[offset : offset + 4 * n].cast("i")
+        offset += 4 * n
+        self._moves = buffer[offset : offset + 4 * n].cast("i")
+        offset += 4 * n
+        self._bounds = buffer[offset : offset + n]
+        offset += n
+        self._ages = buffer[offset : offset + n]
+        self._views = [
+            self._keys,
+            self._values,
+            self._depths,
+            self._moves,
+            self._bounds,
+            self._ages,
+        ]
+
+        self.age = 0
+        self.hits = 0
+        self.misses = 0
+        self.stores = 0
+        self.overwrites = 0
+
+    @classmethod
+    def attach(cls, name: str):
+        """Opens a table created with shared=True in another process"""
+        return TranspositionTable(name=name)
+
+    @property
+    def name(self):
+        """Name of the shared memory block, or None if the table is private"""
+        return self._shm.name if self._shm is not None else None
+
+    def probe(self, key: int):
+        """Returns the entry stored for key, or None if there is none"""
+        i = key % self.size
+        bound = self._bounds[i]
+        if bound:
+            value = self._values[i]
+            depth = self._depths[i]
+            move = self._moves[i]
+            # Keys are stored mixed with their data, so an entry torn by a concurrent
+            # write from another process doesn't match and reads as a miss
+            if self._keys[i] == key ^ _check(value, depth, move, bound):
+                self.hits += 1
+                return Entry(value, Bound(bound), depth, move)
+        self.misses += 1
+        return None
+
+    def store(self, key: int, value: float, depth: int, bound: Bound = Bound.EXACT, move=-1):
+        """
+        Stores a result for key\n
+        An entry for another position in the same slot is only replaced if it came from
+        an earlier search or if the new result is at least as deep
+        """
+        i = key % self.size
+        bound = int(bound)
+        if self._bounds[i]:
+            same = self._keys[i] == key ^ _check(
+                self._values[i], self._depths[i], self._moves[i], self._bounds[i]
+            )
+            if not same:
+                if self._ages[i] == self.age and self._depths[i] > depth:
+                    return False
+                self.overwrites += 1
+
+        self._values[i] = value
+        self._depths[i] = depth
+        self._moves[i] = move
+        self._bounds[i] = bound
+        self._ages[i] = self.age
+        self._keys[i] = key ^ _check(value, depth, move, bound)
+        self.stores += 1
+        return True
+
+    def new_search(self):
+        """Ages every stored entry, so results from earlier searches are replaced first"""
+        self.age = (self.age + 1) % 256
+
+    def clear(self):
+        self._bounds[:] = bytes(self.size)
+        self.hits = self.misses = self.stores = self.overwrites = 0
+
+    @property
+    def stats(self):
+        probes = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / probes if probes else 0.0,
+            "stores": self.stores,
+            "overwrites": self.overwrites,
+        }
+
+    def close(self, unlink: bool = False):
+        """Releases the shared memory block, destroying it if unlink is True"""
+        if self._shm is None:
+            return
+        for view in self._views:
+            view.release()
+        self._shm.close()
+        if unlink:
+            self._shm.unlink()
+        self._shm = None
+
+
+def _check(value: float, depth: int, move: int, bound: int):
+    return hash((value, depth, move, bound)) & _MASK_64
@@ -1,21 +1,44 @@
 from __future__ import annotations
 
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 from enum import Enum
 
 
+# Index of hexes that aren't cells of the board
+OFF_BOARD = -1
+
+
 class Hex:
-    def __init__(self, q: float, r: float, s: float = None):
-        """Data structure representing a hex coordinate using a cube/axial system"""
-        self.s = s if s is not None else -q - r
-        if q + r + self.s > 1e-7:
+    """
+    Data structure representing a hex coordinate using a cube/axial system\n
+    Each board cell has a single canonical instance, returned whenever its coordinates are
+    constructed or computed, so board cells can be compared by identity
+    """
+
+    __slots__ = ("q", "r", "s", "cube", "axial", "index", "_hash", "_neighbours")
+
+    def __new__(cls, q: float, r: float, s: float = None):
+        if s is None or s == -q - r:
+            hex = _interned.get((q, r))
+            if hex is not None:
+                return hex
+
+        hex = super().__new__(cls)
+        hex.s = s if s is not None else -q - r
+        if q + r + hex.s > 1e-7:
             raise ValueError("Coordinates must sum to 0")
-        self.q = q
-        self.r = r
-        self.cube = (self.q, self.r, self.s)
-        self.axial = (self.q, self.r)
+        hex.q = q
+        hex.r = r
+        hex.cube = (hex.q, hex.r, hex.s)
+        hex.axial = (hex.q, hex.r)
+        hex.index = OFF_BOARD
+        hex._hash = hash(hex.axial)
+
+        hex._neighbours: list[Hex] = []
+        return hex
 
-        self._neighbours: list[Hex] = []
+    def __reduce__(self):
+        return Hex, self.cube
 
     def neighbours(self):
         from yinsh.helpers import Direction, neighbour, valid_hexes
@@ -31,19 +54,31 @@ class Hex:
         return f"Hex{self.axial}"
 
     def __eq__(self, other: Hex):
+        if self is other:
+            return True
+        if not isinstance(other, Hex):
+            return NotImplemented
         return self.cube == other.cube
 
     def __hash__(self):
-        return hash(self.axial)
+        return self._hash
 
     def __add__(self, other: Hex):
         if not isinstance(other, Hex):
             raise TypeError(f"Invalid type {type(other)}")
+        if self.index != OFF_BOARD and other.index != OFF_BOARD:
+            hex = _sums[self.index * len(board_cells) + other.index]
+            if hex is not None:
+                return hex
         return Hex(self.q + other.q, self.r + other.r)
 
     def __sub__(self, other: Hex):
         if not isinstance(other, Hex):
             raise TypeError(f"Invalid type {type(other)}")
+        if self.index != OFF_BOARD and other.index != OFF_BOARD:
+            hex = _differences[self.index * len(board_cells) + other.index]
+            if hex is not None:
+                return hex
         return Hex(self.q - other.q, self.r - other.r)
 
     def __len__(self):
@@ -74,6 +109,32 @@ class Hex:
         return Hex(self.q * k, self.r * k)
 
 
+def _board_coordinates():
+    """Yields the axial coordinates of the board cells in coordinate index order"""
+    yield 0, 0
+    for q in range(-5, 6):
+        for r in range(-5, 6):
+            if -5 <= -q - r <= 5 and not ((abs(q) == 5 or q == 0) and (abs(r) == 5 or r == 0)):
+                yield q, r
+
+
+_interned: dict[tuple[float, float], Hex] = {}
+
+# Canonical instances of the 85 board cells, which include the direction vectors
+board_cells: tuple[Hex, ...] = tuple(Hex(q, r) for q, r in _board_coordinates())
+for index, hex in enumerate(board_cells):
+    hex.index = index
+    _interned[hex.axial] = hex
+
+# Sums and differences of every pair of cells by index, None where the result is off the board
+_sums: list[Hex | None] = [
+    _interned.get((a.q + b.q, a.r + b.r)) for a in board_cells for b in board_cells
+]
+_differences: list[Hex | None] = [
+    _interned.get((a.q - b.q, a.r - b.r)) for a in board_cells for b in board_cells
+]
+
+
 class Player(Enum):
     WHITE = True
     BLACK = False
@@ -86,10 +147,37 @@ class Player(Enum):
         self.rings = num_rings
 
 
+@dataclass
+class PlayerState:
+    """Per-game state of a player, holding the number of rings they have removed"""
+
+    player: Player
+    rings: int = 0
+
+    @property
+    def value(self):
+        return self.player.value
+
+    @property
+    def other(self):
+        return self.player.other
+
+    def set_rings(self, num_rings: int):
+        self.rings = num_rings
+
+
 @dataclass
 class Players:
-    white = Player.WHITE
-    black = Player.BLACK
+    white: PlayerState = field(default_factory=lambda: PlayerState(Player.WHITE))
+    black: PlayerState = field(default_factory=lambda: PlayerState(Player.BLACK))
+
+    def __getitem__(self, player: Player):
+        return self.white if player.value else self.black
+
+    def copy(self):
+        return Players(
+            PlayerState(Player.WHITE, self.white.rings), PlayerState(Player.BLACK, self.black.rings)
+        )
 
 
 class Ring(Enum):
@@ -0,0 +1,25 @@
+from __future__ import annotations
+
+from random import Random
+
+from yinsh.helpers import num_cells
+
+# Fixed seed so keys, and anything stored under them, are the same in every process
+_random = Random(0x59494E5348)
+
+
+def _keys(n: int):
+    return [_random.getrandbits(64) for _ in range(n)]
+
+
+# Keys for each piece on each cell, indexed by Player.value then coordinate index
+ring_keys = [_keys(num_cells), _keys(num_cells)]
+marker_keys = [_keys(num_cells), _keys(num_cells)]
+
+# Changing the colour of a marker swaps one marker key for the other
+flip_keys = [black ^ white for black, white in zip(*marker_keys)]
+
+# Keys for the rest of the game state
+white_to_move_key = _random.getrandbits(64)
+setup_key = _random.getrandbits(64)
+removed_keys = [_keys(6), _keys(6)]  # Indexed by Player.value then rings removed